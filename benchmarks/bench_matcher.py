@@ -0,0 +1,77 @@
+"""
+Compare the per-pattern fnmatch/re matching that collect_files() used to do
+against the compiled RuleSet, and report files/sec for both.
+
+    python benchmarks/bench_matcher.py [--names N]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from twogpt.matcher import RuleSet  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "twogpt", "config.json")
+EXTENSIONS = [".py", ".js", ".ts", ".json", ".md", ".png", ".svg", ".o", ".lock", ".txt", ".min.js", ".gz", ""]
+SPECIAL_NAMES = ["Dockerfile", "Makefile", "LICENSE", "allfiles.txt", ".gptignore", "README"]
+
+
+def make_names(count, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        if rng.random() < 0.05:
+            names.append(rng.choice(SPECIAL_NAMES))
+        else:
+            names.append(f"file_{i}{rng.choice(EXTENSIONS)}")
+    return names
+
+
+def legacy_match(names, include_patterns, exclude_patterns):
+    include = [fnmatch.translate(p) for p in include_patterns]
+    exclude = [fnmatch.translate(p) for p in exclude_patterns]
+    return [any(re.match(p, n) for p in include) and not any(re.match(p, n) for p in exclude) for n in names]
+
+
+def compiled_match(names, include_patterns, exclude_patterns):
+    rules = RuleSet(include_patterns, exclude_patterns)
+    return [rules.includes_file(n) for n in names]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=200000, help="Number of synthetic file names to match.")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    include_patterns = config["include_patterns"]
+    exclude_patterns = config["exclude_patterns"] + [config["output_file"], config["ignore_file"]]
+    names = make_names(args.names)
+
+    legacy, legacy_time = timed(legacy_match, names, include_patterns, exclude_patterns)
+    compiled, compiled_time = timed(compiled_match, names, include_patterns, exclude_patterns)
+    if legacy != compiled:
+        mismatches = [n for n, a, b in zip(names, legacy, compiled) if a != b]
+        sys.exit(f"Matchers disagree on {len(mismatches)} names, e.g. {mismatches[:5]}")
+
+    print(f"{len(include_patterns)} include / {len(exclude_patterns)} exclude patterns, {len(names)} names")
+    print(f"  before (fnmatch + re.match per pattern): {len(names) / legacy_time:12,.0f} files/sec")
+    print(f"  after  (RuleSet):                        {len(names) / compiled_time:12,.0f} files/sec")
+    print(f"  speedup: {legacy_time / compiled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
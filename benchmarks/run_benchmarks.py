@@ -0,0 +1,171 @@
+"""
+Benchmark FileCollector on synthetic repositories and store the results as JSON.
+
+    python benchmarks/run_benchmarks.py [--kinds wide,small] [--scale S] [--repeat N] [--output PATH]
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+
+For every synthetic tree (see synth.py) the scenarios generate_tree, collect_files
+and run are timed in-process, and the latency of the 2gpt entry point and its
+subcommands is timed in subprocesses. Results default to benchmarks/results/<commit>.json so runs on
+different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+from synth import KINDS, generate  # noqa: E402
+from twogpt.core import FileCollector  # noqa: E402
+
+ENTRY_POINT = "from twogpt.core import main; main()"
+
+# Name and arguments of the timed 2gpt invocations, in an otherwise empty directory.
+STARTUP_COMMANDS = (
+    ("2gpt", ()),
+    ("list-includes", ("list-includes",)),
+    ("include --permanent", ("include", "*.bench", "--permanent")),
+    ("exclude", ("exclude", "*.bench")),
+)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _measure(func, repeat):
+    """Call func repeat times and return the timings in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(timings):
+    return {"min": min(timings), "median": statistics.median(timings), "runs": timings}
+
+
+def bench_tree(root, repeat):
+    """Time generate_tree, collect_files and run on one synthetic tree."""
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        def generate_tree():
+            collector = FileCollector(root_dir=".")
+            collector.generate_tree()
+
+        def collect_files():
+            # collect_files() appends, start from an empty output like run() would.
+            open("allfiles.txt", 'w').close()
+            collector = FileCollector(root_dir=".")
+            collector.collect_files()
+
+        def run():
+            FileCollector(root_dir=".").run()
+
+        results = {name: _summary(_measure(func, repeat)) for name, func in
+                   (("generate_tree", generate_tree), ("collect_files", collect_files), ("run", run))}
+        results["output_bytes"] = os.path.getsize("allfiles.txt")
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def bench_startup(repeat, args=()):
+    """Time a full `2gpt` process with the given arguments in an empty directory."""
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with tempfile.TemporaryDirectory() as empty:
+        command = [sys.executable, "-c", ENTRY_POINT, *args]
+        return _summary(_measure(lambda: subprocess.run(command, cwd=empty, env=env, check=True,
+                                                        stdout=subprocess.DEVNULL), repeat))
+
+
+def run_suite(kinds, scale, repeat):
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "repeat": repeat,
+        "trees": {},
+        "startup": {},
+    }
+    for name, args in STARTUP_COMMANDS:
+        results["startup"][name] = bench_startup(repeat, args)
+        print(f"startup/{name}: {results['startup'][name]['median'] * 1000:.1f} ms", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as workdir:
+        for kind in kinds:
+            root = generate(kind, os.path.join(workdir, kind), scale)
+            print(f"{kind}: benchmarking...", file=sys.stderr)
+            results["trees"][kind] = bench_tree(root, repeat)
+            shutil.rmtree(root)
+    return results
+
+
+def _flatten(results):
+    """Map 'tree/scenario' names to median seconds."""
+    flat = {f"startup/{name}": data["median"] for name, data in results["startup"].items()}
+    for kind, scenarios in results["trees"].items():
+        for name, data in scenarios.items():
+            if isinstance(data, dict):
+                flat[f"{kind}/{name}"] = data["median"]
+    return flat
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    print(f"{'scenario':<28}{old['commit']:>12}{new['commit']:>12}{'change':>10}")
+    for name in sorted(set(old_flat) | set(new_flat)):
+        before, after = old_flat.get(name), new_flat.get(name)
+        if before is None or after is None:
+            print(f"{name:<28}{before or '-':>12}{after or '-':>12}")
+            continue
+        print(f"{name:<28}{before:>12.4f}{after:>12.4f}{(after - before) / before * 100:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FileCollector on synthetic repositories.")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="Comma separated synthetic tree kinds.")
+    parser.add_argument("--scale", type=float, default=0.2, help="Size of the synthetic trees (see synth.py).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    kinds = [kind for kind in args.kinds.split(",") if kind]
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown))}")
+    results = run_suite(kinds, args.scale, args.repeat)
+    output = args.output or os.path.join(HERE, "results", f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Deterministic synthetic repositories for the benchmarks.
+
+    python benchmarks/synth.py <kind> <path> [--scale S] [--seed N]
+
+Every kind produces the same tree for the same scale and seed, so timings are
+comparable across commits.
+"""
+import argparse
+import os
+import random
+
+PY_LINE = "def function_{i}(value):\n    return value * {i}  # comment {i}\n"
+JS_LINE = "export const item{i} = {{ id: {i}, name: 'item {i}' }};\n"
+MD_LINE = "Paragraph {i} of the synthetic documentation, with a few words of text.\n"
+
+
+def _text(rng, size):
+    """Return roughly size bytes of source-like text."""
+    template = rng.choice((PY_LINE, JS_LINE, MD_LINE))
+    lines = []
+    written = 0
+    i = 0
+    while written < size:
+        line = template.format(i=i)
+        lines.append(line)
+        written += len(line)
+        i += 1
+    return "".join(lines)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    with open(path, mode) as f:
+        f.write(data)
+
+
+def _source_name(rng, index):
+    return f"file_{index}{rng.choice(('.py', '.js', '.md', '.json', '.txt'))}"
+
+
+def wide(path, rng, scale):
+    """One flat directory with many files."""
+    for i in range(int(5000 * scale)):
+        _write(os.path.join(path, _source_name(rng, i)), _text(rng, rng.randint(200, 4000)))
+
+
+def deep(path, rng, scale):
+    """A few long chains of nested directories."""
+    for chain in range(int(20 * scale) or 1):
+        current = os.path.join(path, f"chain_{chain}")
+        for depth in range(40):
+            current = os.path.join(current, f"level_{depth}")
+            _write(os.path.join(current, _source_name(rng, depth)), _text(rng, rng.randint(200, 2000)))
+
+
+def small(path, rng, scale):
+    """Many tiny files spread over a realistic package layout, plus excluded junk directories."""
+    for package in range(int(40 * scale) or 1):
+        for module in range(50):
+            directory = os.path.join(path, "src", f"pkg_{package}", f"mod_{module % 5}")
+            _write(os.path.join(directory, _source_name(rng, module)), _text(rng, rng.randint(20, 300)))
+        _write(os.path.join(path, "node_modules", f"dep_{package}", "index.js"), _text(rng, 500))
+        _write(os.path.join(path, "src", f"pkg_{package}", "logo.png"), rng.randbytes(512))
+
+
+def huge(path, rng, scale):
+    """A handful of very large files next to normal ones."""
+    for i in range(4):
+        _write(os.path.join(path, "dumps", f"dump_{i}.sql"), _text(rng, int(50 * 1024 * 1024 * scale)))
+    for i in range(100):
+        _write(os.path.join(path, "src", _source_name(rng, i)), _text(rng, 2000))
+
+
+def binaries(path, rng, scale):
+    """Source files mixed with binary blobs, minified bundles and generated files that match include patterns."""
+    for i in range(int(1000 * scale)):
+        directory = os.path.join(path, f"dir_{i % 20}")
+        kind = i % 4
+        if kind == 0:
+            _write(os.path.join(directory, f"blob_{i}.json"), rng.randbytes(rng.randint(1024, 64 * 1024)))
+        elif kind == 1:
+            _write(os.path.join(directory, f"bundle_{i}.js"), _text(rng, 20000).replace("\n", ";"))
+        elif kind == 2:
+            _write(os.path.join(directory, f"gen_{i}.py"), "# Code generated by synth. DO NOT EDIT.\n" + _text(rng, 3000))
+        else:
+            _write(os.path.join(directory, _source_name(rng, i)), _text(rng, 3000))
+
+
+KINDS = {
+    "wide": wide,
+    "deep": deep,
+    "small": small,
+    "huge": huge,
+    "binaries": binaries,
+}
+
+
+def generate(kind, path, scale=1.0, seed=0):
+    """Create the synthetic tree `kind` under path (which should not exist yet) and return path."""
+    os.makedirs(path)
+    KINDS[kind](path, random.Random(f"{kind}-{seed}"), scale)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository.")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the number (or size) of files.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.kind, args.path, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
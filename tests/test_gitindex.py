@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from twogpt.gitindex import find_repository, read_index_paths, tracked_files
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs the git executable")
+
+GIT_ENV = {"GIT_AUTHOR_NAME": "t", "GIT_AUTHOR_EMAIL": "t@example.com",
+           "GIT_COMMITTER_NAME": "t", "GIT_COMMITTER_EMAIL": "t@example.com",
+           "GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1"}
+
+
+def git(repo, *args, check=True):
+    result = subprocess.run(["git", *args], cwd=repo, env={**os.environ, **GIT_ENV},
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if check and result.returncode != 0:
+        raise AssertionError(result.stderr.decode())
+    return result.stdout.decode()
+
+
+def ls_files(repo, *args):
+    """`git ls-files` with every conflicted path listed once, like read_index_paths()."""
+    return list(dict.fromkeys(git(repo, "-c", "core.quotePath=false", "ls-files", *args).splitlines()))
+
+
+def write(repo, relpath, text):
+    path = os.path.join(repo, *relpath.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@pytest.fixture(scope="module")
+def conflicted_repo(tmp_path_factory):
+    """A repository in the middle of a merge with a conflict in src/conflict.txt."""
+    repo = str(tmp_path_factory.mktemp("repo"))
+    git(repo, "init", "-q", "-b", "main")
+    write(repo, "README.md", "readme\n")
+    write(repo, "src/conflict.txt", "base\n")
+    write(repo, "src/pkg/module.py", "x = 1\n")
+    write(repo, "src/ümlaut.txt", "non-ASCII name\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "base")
+    git(repo, "checkout", "-q", "-b", "other")
+    write(repo, "src/conflict.txt", "other\n")
+    git(repo, "commit", "-q", "-am", "other")
+    git(repo, "checkout", "-q", "main")
+    write(repo, "src/conflict.txt", "main\n")
+    git(repo, "commit", "-q", "-am", "main")
+    git(repo, "merge", "other", check=False)
+    write(repo, "src/new.py", "intent to add\n")
+    git(repo, "add", "-N", "src/new.py")  # an extended flag, written in versions 3 and 4
+    # A name over 0xFFF bytes, too long for the working tree; index entries without a file are still listed.
+    blob = git(repo, "hash-object", "-w", "README.md").strip()
+    git(repo, "update-index", "--add", "--cacheinfo", f"100644,{blob},src/pkg/{'n' * 200}/{'long' * 1100}.txt")
+    assert "src/conflict.txt" in git(repo, "ls-files", "--unmerged")
+    return repo
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_read_index_paths_matches_ls_files(conflicted_repo, version):
+    git(conflicted_repo, "update-index", "--index-version", str(version))
+    _, git_dir = find_repository(conflicted_repo)
+    paths = read_index_paths(git_dir)
+    assert paths == ls_files(conflicted_repo)
+    assert paths.count("src/conflict.txt") == 1
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_tracked_files_below_a_subdirectory(conflicted_repo, version):
+    git(conflicted_repo, "update-index", "--index-version", str(version))
+    root = os.path.join(conflicted_repo, "src")
+    assert tracked_files(root) == ls_files(root)
+
+
+def test_tracked_files_outside_a_repository(tmp_path):
+    assert tracked_files(str(tmp_path)) is None
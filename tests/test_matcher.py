@@ -0,0 +1,74 @@
+import pytest
+
+from twogpt.matcher import RuleSet
+
+FILE, DIR = False, True
+
+# exclude patterns, path relative to the root, is_dir, excluded
+EXCLUDE_CASES = [
+    # Bare names and globs match the entry name at any depth.
+    (["*.log"], "a.log", FILE, True),
+    (["*.log"], "src/deep/a.log", FILE, True),
+    (["*.log"], "a.log.txt", FILE, False),
+    (["node_modules"], "web/node_modules", DIR, True),
+    (["?.py"], "a.py", FILE, True),
+    (["?.py"], "ab.py", FILE, False),
+    (["[!a]*.txt"], "b.txt", FILE, True),
+    (["[!a]*.txt"], "a.txt", FILE, False),
+    # A trailing '/' only matches directories, at any depth unless anchored.
+    (["build/"], "build", DIR, True),
+    (["build/"], "src/build", DIR, True),
+    (["build/"], "build", FILE, False),
+    # A leading or middle '/' anchors the pattern at the root.
+    (["/build"], "build", DIR, True),
+    (["/build"], "src/build", DIR, False),
+    (["docs/*.md"], "docs/a.md", FILE, True),
+    (["docs/*.md"], "src/docs/a.md", FILE, False),
+    (["docs/*.md"], "docs/sub/a.md", FILE, False),
+    # '**' matches across directory levels, including none.
+    (["**/tmp"], "tmp", DIR, True),
+    (["**/tmp"], "a/b/tmp", DIR, True),
+    (["a/**/b"], "a/b", FILE, True),
+    (["a/**/b"], "a/x/y/b", FILE, True),
+    (["a/**/b"], "x/a/b", FILE, False),
+    (["logs/**"], "logs/2024/app.log", FILE, True),
+    # '!' re-includes, and the last matching pattern wins.
+    (["*.log", "!keep.log"], "keep.log", FILE, False),
+    (["*.log", "!keep.log"], "drop.log", FILE, True),
+    (["*.log", "!keep.log"], "src/keep.log", FILE, False),
+    (["!keep.log", "*.log"], "keep.log", FILE, True),
+    (["build/", "!build/"], "build", DIR, False),
+    (["*.log", "!/keep.log"], "src/keep.log", FILE, True),
+    (["*.log", "!/keep.log"], "keep.log", FILE, False),
+]
+
+
+@pytest.mark.parametrize("patterns, relpath, is_dir, excluded", EXCLUDE_CASES)
+def test_exclude_patterns(patterns, relpath, is_dir, excluded):
+    rules = RuleSet(["*"], patterns)
+    name = relpath.rsplit("/", 1)[-1]
+    check = rules.excludes_dir if is_dir else rules.excludes_file
+    assert check(name, relpath) is excluded
+
+
+@pytest.mark.parametrize("patterns, relpath, skipped", [
+    (["build/**"], "build", True),
+    (["build/**"], "src", False),
+    (["**/cache/**"], "a/cache", True),
+    (["build/**", "!build/keep.txt"], "build", False),  # a negation may re-include a child
+])
+def test_excludes_contents(patterns, relpath, skipped):
+    assert RuleSet(["*"], patterns).excludes_contents(relpath) is skipped
+
+
+@pytest.mark.parametrize("include, exclude, relpath, included", [
+    (["*.py"], [], "src/a.py", True),
+    (["*.py"], [], "src/a.txt", False),
+    (["*.py", "*.md"], [], "README.md", True),
+    (["*.py"], ["tests/"], "tests/test_a.py", True),  # the walker prunes tests/, the file itself is not matched
+    (["*.py"], ["/setup.py"], "setup.py", False),
+    (["*.py"], ["/setup.py"], "pkg/setup.py", True),
+])
+def test_include_patterns(include, exclude, relpath, included):
+    name = relpath.rsplit("/", 1)[-1]
+    assert RuleSet(include, exclude).includes_file(name, relpath) is included
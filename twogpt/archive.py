@@ -0,0 +1,235 @@
+"""
+Zip and tar archives (including wheels and compressed tarballs) as the root of a collection.
+
+The member list is read once from the archive's headers; contents are streamed member by member with no
+extraction to disk. Zip members and members of uncompressed tars are read at their offset. Compressed
+tars can only be decompressed forward, and seeking backwards restarts decompression from the start, so:
+
+- the listing pass also keeps the first SNIFF_SIZE bytes of every member (read_head()), enough to sniff files and
+  estimate their tokens without going back;
+- the members that end up in the output (see prefetch()) are copied in one more forward pass, in archive order,
+  to a spool that is kept in memory up to SPOOL_MEMORY bytes and goes to a temporary file beyond; reads are
+  served from there.
+
+Collecting a compressed tar therefore needs temporary disk space of up to the uncompressed size of the
+selected files (plus SNIFF_SIZE per member) once that exceeds SPOOL_MEMORY.
+"""
+import io
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+
+from .sniff import SNIFF_SIZE
+
+# Selected members of a compressed tar are spooled in memory up to this size, then to a temporary file.
+SPOOL_MEMORY = 32 * 1024 * 1024
+COPY_SIZE = 1024 * 1024
+
+ArchiveMember = namedtuple("ArchiveMember", ["relpath", "size", "mtime_ns", "info"])
+
+
+def is_archive(path):
+    """Return True if path is a readable zip or tar archive."""
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+
+def _is_compressed_tar(path):
+    try:
+        with tarfile.open(path, "r:"):
+            return False
+    except tarfile.ReadError:
+        return True
+
+
+class _SpooledMember(io.RawIOBase):
+    """A seekable reader of one member's bytes in the spool, shared by all threads under the archive's lock."""
+
+    def __init__(self, spool, lock, offset, size):
+        super().__init__()
+        self._spool = spool
+        self._lock = lock
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self._size - self._position)
+        if length <= 0:
+            return 0
+        with self._lock:
+            self._spool.seek(self._offset + self._position)
+            data = self._spool.read(length)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def _clean_name(name):
+    """Return a member name as a '/'-separated relative path, or None for names that leave the root."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+
+class Archive:
+    """Member listing and streaming reads of a zip or tar archive. Reads are safe from several threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.members = {}  # relpath -> ArchiveMember of regular files
+        self.dirs = []  # relpaths of directory entries, which may be empty
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tars = []
+        self._zip = None
+        self._compressed = False
+        self._wanted = set()  # relpaths the spool should hold, see prefetch()
+        self._spool = None
+        self._spooled = {}  # relpath -> (offset, size) in the spool
+        self._heads = None  # compressed tars: spool of the members' first SNIFF_SIZE bytes
+        self._head_spans = {}  # relpath -> (offset, size) in self._heads
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                self._add(info.filename, info.is_dir(), info.file_size,
+                          int(time.mktime(info.date_time + (0, 0, -1)) * 1e9), info)
+        elif tarfile.is_tarfile(path):
+            self._compressed = _is_compressed_tar(path)
+            if self._compressed:
+                import tempfile
+                self._heads = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+            with tarfile.open(path) as tar:
+                for info in tar:
+                    # Links and devices have no content of their own and are left out, like unreadable files.
+                    if info.isdir() or info.isreg():
+                        relpath = self._add(info.name, info.isdir(), info.size, int(info.mtime * 1e9), info)
+                        if relpath is not None and self._heads is not None and not info.isdir():
+                            # The data follows the header just read: keeping its head costs no backward seek.
+                            offset = self._heads.tell()
+                            self._heads.write(tar.extractfile(info).read(SNIFF_SIZE))
+                            self._head_spans[relpath] = (offset, self._heads.tell() - offset)
+        else:
+            raise ValueError(f"{path} is neither a directory nor a zip or tar archive")
+
+    def _add(self, name, is_dir, size, mtime_ns, info):
+        relpath = _clean_name(name)
+        if relpath is None:
+            return None
+        if is_dir:
+            self.dirs.append(relpath)
+        else:
+            self.members[relpath] = ArchiveMember(relpath, size, mtime_ns, info)
+        return relpath
+
+    def relpaths(self):
+        """Return the member paths for walker.scan_paths(): files, and directories with a trailing '/'."""
+        return list(self.members) + [relpath + "/" for relpath in self.dirs]
+
+    def stat(self, relpath):
+        """Return (size, mtime_ns) of a file member."""
+        member = self.members[relpath]
+        return member.size, member.mtime_ns
+
+    def read_head(self, relpath):
+        """Return the first SNIFF_SIZE bytes of a file member; compressed tars serve them from the listing pass."""
+        span = self._head_spans.get(relpath)
+        if span is None:
+            with self.open(relpath) as f:
+                return f.read(SNIFF_SIZE)
+        with self._lock:
+            self._heads.seek(span[0])
+            return self._heads.read(span[1])
+
+    def prefetch(self, relpaths):
+        """
+        Announce the members a run is going to read in full: only these take space in the spool. For a compressed
+        tar they are copied by a single forward pass, done when the first of them is opened (so a run that reads
+        none costs nothing).
+        """
+        if self._compressed:
+            with self._lock:
+                self._wanted = set(relpaths).intersection(self.members)
+
+    def _fill_spool(self):
+        """Copy the wanted members that are not spooled yet, in archive order; called with self._lock held."""
+        import tempfile
+        if self._spool is None:
+            self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        missing = sorted((self.members[relpath] for relpath in self._wanted if relpath not in self._spooled),
+                         key=lambda member: member.info.offset_data)
+        if not missing:
+            return
+        self._spool.seek(0, io.SEEK_END)
+        with tarfile.open(self.path) as tar:
+            for member in missing:
+                offset = self._spool.tell()
+                source = tar.extractfile(member.info)
+                while True:
+                    data = source.read(COPY_SIZE)
+                    if not data:
+                        break
+                    self._spool.write(data)
+                self._spooled[member.relpath] = (offset, self._spool.tell() - offset)
+
+    def open(self, relpath):
+        """Open a file member for binary reading."""
+        member = self.members.get(relpath)
+        if member is None:
+            raise FileNotFoundError(f"{relpath} is not a file in {self.path}")
+        if self._zip is not None:
+            return self._zip.open(member.info)
+        if relpath in self._wanted:
+            with self._lock:
+                if relpath not in self._spooled:
+                    self._fill_spool()
+                offset, size = self._spooled[relpath]
+            return _SpooledMember(self._spool, self._lock, offset, size)
+        # Every thread reads through its own TarFile; the headers read before are reused.
+        tar = getattr(self._local, "tar", None)
+        if tar is None or tar.closed:
+            tar = self._local.tar = tarfile.open(self.path)
+            with self._lock:
+                self._tars.append(tar)
+        return tar.extractfile(member.info)
+
+    def release(self):
+        """Close the per-thread tar handles opened for reading and drop the spool (both are recreated on demand)."""
+        with self._lock:
+            tars, self._tars = self._tars, []
+            spool, self._spool = self._spool, None
+            self._spooled = {}
+            self._wanted = set()
+        for tar in tars:
+            tar.close()
+        if spool is not None:
+            spool.close()
+
+    def close(self):
+        self.release()
+        if self._heads is not None:
+            self._heads.close()
+        if self._zip is not None:
+            self._zip.close()
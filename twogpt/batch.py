@@ -0,0 +1,98 @@
+"""
+Batch mode (2gpt batch): collect many roots in one process.
+
+Roots are directories or archives. Every root gets its own FileCollector, config and output file, but parsed configs and compiled RuleSets
+are shared through configcache, and the roots are processed concurrently on a thread pool.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .stats import RunStats
+
+logger = logging.getLogger(__name__)
+
+
+def read_roots(path):
+    """Read root directories from a file, one per line; blank lines and '#' comments are ignored.
+    Relative roots are resolved against the file's directory."""
+    base = os.path.dirname(os.path.abspath(path))
+    roots = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                roots.append(os.path.join(base, line))
+    return roots
+
+
+def run_batch(roots, make_collector, workers=None):
+    """
+    Run make_collector(root).run() for every root on up to workers threads (default: one per CPU).
+    Returns a list of (root, collector or None, seconds, error or None) in the order of roots.
+    A root whose output file is already written by an earlier root fails instead of overwriting it.
+    """
+    collectors = []
+    outputs = {}  # output path -> root writing it
+    for root in roots:
+        try:
+            if not os.path.exists(root):
+                raise FileNotFoundError(f"{root} does not exist")
+            collector = make_collector(root)
+            output = os.path.abspath(collector.output_path())
+            if output in outputs:
+                collector.close()
+                raise ValueError(f"would overwrite the output of {outputs[output]} ({output})")
+            outputs[output] = root
+            collectors.append((root, collector, None))
+        except Exception as e:
+            logger.error(f"{root}: {e}")
+            collectors.append((root, None, e))
+
+    def process(item):
+        root, collector, error = item
+        if error is not None:
+            return root, None, 0.0, error
+        start = time.perf_counter()
+        try:
+            collector.run()
+        except Exception as e:
+            logger.error(f"{root}: {e}")
+            return root, collector, time.perf_counter() - start, e
+        finally:
+            collector.close()
+        logger.info(f"{root}: done in {time.perf_counter() - start:.3f}s.")
+        return root, collector, time.perf_counter() - start, None
+
+    workers = max(1, min(len(roots), workers or os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(process, collectors))
+
+
+def combined_stats(results, started):
+    """Merge the RunStats of all successful roots; started is the perf_counter() value the batch started at."""
+    combined = RunStats()
+    combined.started = started
+    for _, collector, _, error in results:
+        if collector is not None and error is None:
+            combined.merge(collector.stats)
+    return combined
+
+
+def report(results, started, workers):
+    """Return the combined timing report of a batch started at perf_counter() value started."""
+    elapsed = time.perf_counter() - started
+    collectors = [collector for _, collector, _, error in results if collector is not None and error is None]
+    rule_sets = len({id(collector.rules()) for collector in collectors})
+    width = max([len("root")] + [len(root) for root, _, _, _ in results])
+    lines = [f"Batch of {len(results)} roots in {elapsed:.3f}s on {workers} workers ({rule_sets} distinct rule sets):",
+             f"  {'root':<{width}}  {'files':>8}  {'bytes out':>14}  {'seconds':>8}"]
+    for root, collector, seconds, error in results:
+        if error is not None:
+            lines.append(f"  {root:<{width}}  failed: {error}")
+            continue
+        counters = collector.stats.counters
+        lines.append(f"  {root:<{width}}  {counters['files_included']:>8,}  {counters['bytes_out']:>14,}  {seconds:>8.3f}")
+    lines.append(combined_stats(results, started).report())
+    return "\n".join(lines)
@@ -0,0 +1,280 @@
+"""
+Content compaction: per-file text transforms that shrink the output, configured in .gptignore.
+
+    "compaction": {
+        "*": ["whitespace"],
+        "*.py": ["license_header", "comments"],
+        "*.json": ["json_arrays:20"]
+    }
+
+Every pattern matching a file's name contributes its transforms, in config order (each transform runs once).
+A transform takes an optional argument after a colon. Transforms work on whole decoded files and are plain
+functions of module level, so they can run in a process pool. Files that only get "whitespace" are streamed
+line by line instead (see stream_whitespace), so they are compacted at any size; other transforms are not
+applied to files over MAX_COMPACT_SIZE, which would have to be held in memory several times over.
+"""
+import io
+import json
+import os
+import re
+import tokenize
+
+from .matcher import PatternMatcher
+
+# Files at least this big are compacted in a worker process when --jobs allows it;
+# below that, pickling costs more than the transform.
+PROCESS_THRESHOLD = 256 * 1024
+# Files bigger than this are only compacted if all their transforms can be streamed.
+MAX_COMPACT_SIZE = 8 * 1024 * 1024
+
+LICENSE_RE = re.compile(r"licen[cs]e|copyright|\(c\)|spdx-license-identifier", re.I)
+
+PYTHON_EXTENSIONS = {".py", ".pyw", ".pyi"}
+# Languages with C-style // and /* */ comments; the value says whether backticks delimit strings.
+C_LIKE_EXTENSIONS = {
+    ".c": False, ".h": False, ".cpp": False, ".hpp": False, ".cc": False, ".cs": False, ".java": False,
+    ".kt": False, ".swift": False, ".php": False, ".scala": False, ".rs": False,
+    ".js": True, ".jsx": True, ".ts": True, ".tsx": True, ".mjs": True, ".go": True,
+}
+BLOCK_COMMENT_EXTENSIONS = {".css"}
+
+DEFAULT_JSON_ITEMS = 20
+
+
+def _collapse_blank_lines(lines):
+    """rstrip every line and keep at most one blank line in a row; leading and trailing blank lines are dropped."""
+    out = []
+    for line in lines:
+        line = line.rstrip()
+        if line or (out and out[-1]):
+            out.append(line)
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+def normalize_whitespace(text, filename, arg=None):
+    """Strip trailing whitespace and collapse runs of blank lines into one."""
+    lines = _collapse_blank_lines(text.split("\n"))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def stream_whitespace(chunks):
+    """
+    normalize_whitespace() over an iterable of UTF-8 chunks (each valid UTF-8 by itself, as iter_text_chunks
+    yields them), holding one line at a time. Yields the result as non-empty UTF-8 chunks.
+    """
+    pending = ""
+    written = gap = False
+
+    def normalize(lines):
+        nonlocal written, gap
+        out = []
+        for line in lines:
+            line = line.rstrip()
+            if not line:
+                gap = written
+                continue
+            out.append("\n" + line + "\n" if gap else line + "\n")
+            written, gap = True, False
+        return "".join(out).encode('utf-8')
+
+    for chunk in chunks:
+        lines = (pending + chunk.decode('utf-8')).split("\n")
+        pending = lines.pop()
+        data = normalize(lines)
+        if data:
+            yield data
+    data = normalize([pending])
+    if data:
+        yield data
+
+
+def _comment_block_end(lines, start):
+    """Return the index after the comment block starting at lines[start] (start if there is none)."""
+    if start >= len(lines):
+        return start
+    first = lines[start].lstrip()
+    for opener, closer in (("/*", "*/"), ("<!--", "-->"), ('"""', '"""'), ("'''", "'''")):
+        if first.startswith(opener):
+            if closer in first[len(opener):]:
+                return start + 1
+            for end in range(start + 1, len(lines)):
+                if closer in lines[end]:
+                    return end + 1
+            return start
+    for prefix in ("#", "//", "--", ";"):
+        if first.startswith(prefix) and not first.startswith("#!"):
+            end = start
+            while end < len(lines) and lines[end].lstrip().startswith(prefix):
+                end += 1
+            return end
+    return start
+
+
+def strip_license_header(text, filename, arg=None):
+    """Drop a leading comment block mentioning a license or copyright (a shebang line is kept)."""
+    lines = text.splitlines(keepends=True)
+    shebang = lines[:1] if lines and lines[0].startswith("#!") else []
+    start = len(shebang)
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    end = _comment_block_end(lines, start)
+    if end == start or not LICENSE_RE.search("".join(lines[start:end])):
+        return text
+    while end < len(lines) and not lines[end].strip():
+        end += 1
+    return "".join(shebang + lines[end:])
+
+
+def _strip_python_comments(text):
+    lines = text.splitlines(keepends=True)
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return text
+    for token in tokens:
+        if token.type != tokenize.COMMENT:
+            continue
+        row, col = token.start
+        if row == 1 and token.string.startswith("#!"):
+            continue
+        line = lines[row - 1]
+        code = line[:col].rstrip()
+        # Comment-only lines disappear completely, trailing comments leave the code.
+        lines[row - 1] = code + line[len(line.rstrip("\r\n")):] if code else ""
+    return "".join(lines)
+
+
+def _strip_c_comments(text, backtick_strings, line_comments=True):
+    """
+    Remove // and /* */ comments outside of string literals. This is a lexer, not a parser: e.g. JavaScript
+    regex literals containing '//' or '/*' can be mistaken for comments.
+    """
+    quotes = "\"'`" if backtick_strings else "\"'"
+    out = []
+    start = i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in quotes:
+            i += 1
+            while i < n and text[i] != c:
+                if text[i] == "\\":
+                    i += 1
+                elif text[i] == "\n" and c != "`":
+                    break  # Unterminated literal (e.g. a Rust lifetime), resume at the line end.
+                i += 1
+            i += 1
+        elif c == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            out.append(text[start:i])
+            start = i = n if end == -1 else end + 2
+        elif c == "/" and line_comments and text.startswith("//", i):
+            end = text.find("\n", i)
+            out.append(text[start:i])
+            start = i = n if end == -1 else end
+        else:
+            i += 1
+    out.append(text[start:])
+    return "".join(out)
+
+
+def strip_comments(text, filename, arg=None):
+    """Strip comments from Python and C-like sources (picked by extension); other files are returned unchanged."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in PYTHON_EXTENSIONS:
+        stripped = _strip_python_comments(text)
+    elif ext in C_LIKE_EXTENSIONS:
+        stripped = _strip_c_comments(text, C_LIKE_EXTENSIONS[ext])
+    elif ext in BLOCK_COMMENT_EXTENSIONS:
+        stripped = _strip_c_comments(text, False, line_comments=False)
+    else:
+        return text
+    if stripped == text:
+        return text
+    lines = _collapse_blank_lines(stripped.split("\n"))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def truncate_json_arrays(text, filename, arg=None):
+    """
+    Keep the first N (default 20) items of every JSON array and replace the rest by a "... N more items" string.
+    Files that are not valid JSON, or have no long arrays, are returned unchanged.
+    """
+    limit = int(arg) if arg else DEFAULT_JSON_ITEMS
+    truncated = False
+
+    def shorten(value):
+        nonlocal truncated
+        if isinstance(value, list):
+            items = [shorten(item) for item in value[:limit]]
+            if len(value) > limit:
+                truncated = True
+                items.append(f"... {len(value) - limit} more items")
+            return items
+        if isinstance(value, dict):
+            return {key: shorten(item) for key, item in value.items()}
+        return value
+
+    try:
+        data = shorten(json.loads(text))
+    except (ValueError, RecursionError):
+        return text
+    if not truncated:
+        return text
+    indent = 2 if "\n" in text.strip() else None
+    return json.dumps(data, indent=indent, ensure_ascii=False) + ("\n" if text.endswith("\n") else "")
+
+
+TRANSFORMS = {
+    "whitespace": normalize_whitespace,
+    "license_header": strip_license_header,
+    "comments": strip_comments,
+    "json_arrays": truncate_json_arrays,
+}
+
+
+def _parse_transform(spec):
+    name, _, arg = spec.partition(":")
+    if name not in TRANSFORMS:
+        raise ValueError(f"Unknown compaction transform {name!r}, expected one of {', '.join(TRANSFORMS)}")
+    return name, arg or None
+
+
+def is_streamable(transforms):
+    """Return True if the transform specs can be applied by compact_stream()."""
+    return all(spec == "whitespace" for spec in transforms)
+
+
+def compact_stream(chunks, transforms):
+    """Apply streamable transform specs (see is_streamable) to UTF-8 chunks, yielding UTF-8 chunks."""
+    return stream_whitespace(chunks) if transforms else chunks
+
+
+def compact(data, filename, transforms):
+    """Apply the transform specs (e.g. ["comments", "json_arrays:50"]) to UTF-8 content and return the result as UTF-8."""
+    text = data.decode('utf-8')
+    for spec in transforms:
+        name, arg = _parse_transform(spec)
+        text = TRANSFORMS[name](text, filename, arg)
+    return text.encode('utf-8')
+
+
+class Compactor:
+    """The "compaction" section of the config: which transforms apply to a file, by name pattern."""
+
+    def __init__(self, rules):
+        self.rules = []
+        for pattern, transforms in rules.items():
+            for spec in transforms:
+                _parse_transform(spec)
+            self.rules.append((PatternMatcher([pattern]), list(transforms)))
+
+    def transforms_for(self, name):
+        """Return the transform specs for a file name, in config order (empty if none applies)."""
+        transforms = []
+        for matcher, specs in self.rules:
+            if matcher.match(name):
+                transforms.extend(spec for spec in specs if spec not in transforms)
+        return tuple(transforms)
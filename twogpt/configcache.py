@@ -0,0 +1,33 @@
+"""
+Process-wide caches of the resolved configuration, shared by every FileCollector (watch, batch runs, library use).
+
+Parsed config files are kept until the file's mtime or size changes, compiled RuleSets are shared by all
+collectors with the same patterns. Nothing is kept on disk, so a single CLI invocation gains nothing from
+these caches; they save the re-reading and re-compiling in long-lived processes (watch rebuilds, batch runs
+over many roots sharing a global config, library use).
+"""
+import copy
+import json
+import os
+from functools import lru_cache
+
+_config_files = {}  # absolute path -> ((mtime_ns, size), parsed content)
+
+
+def load_config_file(path):
+    """Return the parsed JSON config at path; callers get their own copy and may modify it."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _config_files.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, 'r') as config_file:
+            cached = _config_files[path] = (key, json.load(config_file))
+    return copy.deepcopy(cached[1])
+
+
+@lru_cache(maxsize=32)
+def compiled_rules(include_patterns, exclude_patterns):
+    """Return the RuleSet for a frozenset of include patterns and a tuple of exclude patterns (in evaluation order)."""
+    from .matcher import RuleSet
+    return RuleSet(include_patterns, exclude_patterns)
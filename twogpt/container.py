@@ -0,0 +1,174 @@
+"""
+Indexed snapshot container: the plain-text output plus an O(1) lookup table.
+
+Layout (all integers little-endian):
+
+    header   64 bytes   magic, version, data/table/strings offsets and sizes
+    data                the plain-text output, byte for byte (tree section and blocks)
+    table               open-addressing hash table of SLOT entries, a power of two in size
+    strings             UTF-8 paths referenced by the table
+
+A lookup hashes the path, probes the table and returns the content as a
+memoryview over the mmap'd file, so finding and reading one file costs the
+same no matter how big the snapshot is.
+"""
+import hashlib
+import mmap
+import struct
+from collections import namedtuple
+
+MAGIC = b"2GPTIDX\0"
+VERSION = 1
+
+# magic, version, reserved, data offset, data length, table offset, table slots, strings offset, strings length
+HEADER = struct.Struct("<8sII6Q")
+# path hash, path offset, path length, flags, content offset, content length, source hash
+SLOT = struct.Struct("<QQIIQQ16s")
+_OCCUPIED = 1
+
+# content_offset is relative to the data region, i.e. the offset in the plain-text output.
+IndexEntry = namedtuple("IndexEntry", ["path", "content_offset", "content_length", "hash"])
+
+
+def _path_hash(path_bytes):
+    return int.from_bytes(hashlib.blake2b(path_bytes, digest_size=8).digest(), "little")
+
+
+def _table_size(count):
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+def write_index(f, data_offset, data_length, entries):
+    """
+    Append the table and strings for entries (IndexEntry list) to the binary file f, positioned right after
+    the data region, and fill in the header at the start of f.
+    """
+    slots = _table_size(len(entries))
+    table = [None] * slots
+    strings = bytearray()
+    for entry in entries:
+        path_bytes = entry.path.encode('utf-8')
+        path_hash = _path_hash(path_bytes)
+        digest = bytes.fromhex(entry.hash) if entry.hash else b""
+        slot = path_hash & (slots - 1)
+        while table[slot] is not None:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = SLOT.pack(path_hash, len(strings), len(path_bytes), _OCCUPIED,
+                                entry.content_offset, entry.content_length, digest[:16].ljust(16, b"\0"))
+        strings += path_bytes
+
+    table_offset = data_offset + data_length
+    empty = SLOT.pack(0, 0, 0, 0, 0, 0, b"\0" * 16)
+    f.write(b"".join(slot if slot is not None else empty for slot in table))
+    strings_offset = table_offset + slots * SLOT.size
+    f.write(strings)
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, 0, data_offset, data_length, table_offset, slots,
+                        strings_offset, len(strings)))
+
+
+class SnapshotReader:
+    """
+    Random access to a container written with --format indexed.
+
+        with SnapshotReader("allfiles.2gpt") as snapshot:
+            content = snapshot["./src/app.py"]   # memoryview, no copy
+
+    Returned memoryviews point into the mmap without copying. Closing the reader while some are still
+    alive leaves the mapping to be unmapped once the last of them is garbage collected.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            (magic, version, _, self.data_offset, self.data_length, self.table_offset, self.slots,
+             self.strings_offset, self.strings_length) = HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{path} is not a 2gpt container")
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} 2gpt container")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            mapping, self._mmap = self._mmap, None
+            try:
+                self._view.release()
+                mapping.close()
+            except BufferError:
+                pass  # Views handed out are still alive; the mmap closes itself when they are collected.
+
+    def _slot(self, index):
+        return SLOT.unpack_from(self._mmap, self.table_offset + index * SLOT.size)
+
+    def _slot_path(self, slot):
+        start = self.strings_offset + slot[1]
+        return bytes(self._view[start:start + slot[2]])
+
+    def entry(self, path):
+        """Return the IndexEntry for path, or None if the snapshot has no block for it."""
+        path_bytes = path.encode('utf-8')
+        path_hash = _path_hash(path_bytes)
+        mask = self.slots - 1
+        index = path_hash & mask
+        while True:
+            slot = self._slot(index)
+            if not slot[3] & _OCCUPIED:
+                return None
+            if slot[0] == path_hash and self._slot_path(slot) == path_bytes:
+                return IndexEntry(path, slot[4], slot[5], slot[6].hex())
+            index = (index + 1) & mask
+
+    def get(self, path, default=None):
+        """Return the content of path as a zero-copy memoryview, or default."""
+        entry = self.entry(path)
+        if entry is None:
+            return default
+        start = self.data_offset + entry.content_offset
+        return self._view[start:start + entry.content_length]
+
+    def __getitem__(self, path):
+        content = self.get(path)
+        if content is None:
+            raise KeyError(path)
+        return content
+
+    def __contains__(self, path):
+        return self.entry(path) is not None
+
+    def __iter__(self):
+        """Iterate over the paths in the snapshot (in table order)."""
+        for index in range(self.slots):
+            slot = self._slot(index)
+            if slot[3] & _OCCUPIED:
+                yield self._slot_path(slot).decode('utf-8')
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def text(self):
+        """Return the plain-text output stored in the container as a memoryview."""
+        return self._view[self.data_offset:self.data_offset + self.data_length]
+
+
+def to_plain_text(path, output_file):
+    """Convert a container back to the plain-text allfiles.txt format."""
+    with SnapshotReader(path) as snapshot, open(output_file, 'wb') as f:
+        text = snapshot.text()
+        try:
+            f.write(text)
+        finally:
+            text.release()
@@ -0,0 +1,104 @@
+import codecs
+import io
+from collections import namedtuple
+
+# Size of the reads used to stream file contents into the output.
+CHUNK_SIZE = 256 * 1024
+
+# Files up to this size are read completely by the worker threads in --jobs
+# mode; bigger ones are streamed by the writer so memory stays bounded.
+PREFETCH_LIMIT = 1024 * 1024
+
+# A file yielded by FileCollector.iter_files(): relpath is '/'-separated and relative to the root,
+# chunks iterates over the content as UTF-8 bytes, path is the name used in the output's markers and
+# duplicate_of the path of an earlier file with the same content (with dedup only).
+CollectedFile = namedtuple("CollectedFile", ["relpath", "size", "chunks", "path", "duplicate_of"], defaults=[None])
+
+
+def _decoding_chunks(data, f, chunk_size):
+    """Decode data and the rest of f like text mode with errors='ignore' would, and re-encode as UTF-8."""
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')('ignore'), translate=True)
+    while data:
+        text = decoder.decode(data)
+        if text:
+            yield text.encode('utf-8')
+        data = f.read(chunk_size)
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text.encode('utf-8')
+
+
+def iter_text_chunks(f, chunk_size=CHUNK_SIZE):
+    """
+    Yield the content of the binary file object f as UTF-8 bytes, chunk by chunk.
+
+    The result is the same as `open(path, 'r', encoding='utf-8', errors='ignore').read()`
+    encoded back to UTF-8, but only one chunk is held in memory. Valid UTF-8
+    without carriage returns (the common case) is passed through as raw bytes;
+    from the first chunk that needs newline translation or drops invalid bytes,
+    the rest of the file goes through an incremental decoder. Empty chunks are
+    never yielded.
+    """
+    carry = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        data = carry + chunk if carry else chunk
+        carry = b''
+        if b'\r' in data:
+            yield from _decoding_chunks(data, f, chunk_size)
+            return
+        try:
+            data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            if e.reason != 'unexpected end of data':
+                yield from _decoding_chunks(data, f, chunk_size)
+                return
+            # A multi-byte character is split across reads; finish it with the next chunk.
+            carry = data[e.start:]
+            data = data[:e.start]
+        if data:
+            yield data
+    if carry:
+        # Truncated character at the end of the file, dropped just like errors='ignore' would.
+        yield from _decoding_chunks(carry, f, chunk_size)
+
+
+class HashingReader:
+    """Wrap a binary file object and feed everything read through it into a hash object."""
+
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.hasher.update(data)
+        return data
+
+
+class LimitedReader:
+    """Wrap a binary file object and stop reading after limit bytes."""
+
+    def __init__(self, f, limit):
+        self.f = f
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+
+def iter_file_range(f, offset, length, chunk_size=CHUNK_SIZE):
+    """Yield length bytes of the binary file object f starting at offset, chunk by chunk."""
+    f.seek(offset)
+    while length > 0:
+        data = f.read(min(chunk_size, length))
+        if not data:
+            raise EOFError(f"{getattr(f, 'name', 'file')} ended {length} bytes before the expected range end")
+        length -= len(data)
+        yield data
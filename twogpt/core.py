@@ -1,21 +1,99 @@
-import argparse
+# Only what every invocation needs is imported here; modules used by a single feature (and heavy standard
+# library modules like concurrent.futures or shutil) are imported where they are used, so that
+# e.g. `2gpt list-includes` starts quickly.
+import hashlib
 import json
+import logging
 import os
-import fnmatch
-import re
-from dir_tree import DirectoryTree
-import shutil  # For copying the global config
+import sys
+import threading
+import time
+
+from .configcache import compiled_rules, load_config_file
+from .content import PREFETCH_LIMIT, CollectedFile, HashingReader, LimitedReader, iter_file_range, iter_text_chunks
+from .manifest import Manifest, ManifestEntry, manifest_path
+from .pipeline import ordered_map
+from .shards import RollingWriter, container_path, index_name, parse_shard_size, plan_shards, shard_name, shard_patterns, write_index
+from .sniff import BINARY, SNIFF_SIZE, sniff
+from .stats import RunStats
+from .tokens import Prioritizer, estimate_file_tokens, estimate_text_tokens, pack
+from .walker import scan_paths, scan_tree
+
+logger = logging.getLogger(__name__)
+
+
+def _block_markers(file_path):
+    """The START and END marker lines framing a file's block in the output, as UTF-8."""
+    return (f"----- START OF {file_path} -----\n".encode('utf-8'),
+            f"\n----- END OF {file_path} -----\n\n\n".encode('utf-8'))
+
+
+def _duplicate_reference(duplicate_of):
+    """The content written instead of a duplicate file's content."""
+    return f"[Same content as {duplicate_of}]".encode('utf-8')
+
 
 class FileCollector:
-    def __init__(self, root_dir='.', use_global_config=False, permanent=False):
+    def __init__(self, root_dir='.', use_global_config=False, permanent=False, jobs=1, incremental=False, full=False,
+                 max_tokens=None, skip_generated=None, source="fs", shard_size=None,
+                 output_format="text", dedup=False, compact=True, tree_depth=None, tree_max_entries=None,
+                 detailed_stats=False):
         """
         Initialize the FileCollector with a given root directory.
         If use_global_config is True, work with the global config file. Otherwise, use the local config if it exists.
         If the local config doesn't exist and permanent changes are requested, create it.
+        jobs is the number of threads reading file contents; the output is the same for any value.
+        If incremental is True, a manifest next to the output file lets later runs copy the blocks of
+        unchanged files from the previous output; full forces a rebuild (and a fresh manifest).
+        max_tokens caps the estimated token count of the output; files are packed in the priority order from the config.
+        Binary files are always skipped unless the config sets skip_binary to false; skip_generated also skips
+        minified and generated files (defaults to the config's skip_generated).
+        source is "fs" to walk the directory or "git" to list the files tracked in the repository's index
+        (falling back to the walk outside a git repository).
+        shard_size (e.g. "10MB" or "100k tokens") splits the output into numbered shards written in parallel,
+        with an index mapping every file to its shard.
+        output_format "indexed" writes an indexed container (allfiles.2gpt) for O(1) lookups of single files
+        instead of the plain-text output; see container.SnapshotReader.
+        root_dir may also be a zip or tar archive (e.g. a wheel or a release tarball): its members are matched,
+        listed and streamed without extracting them, and the output and local config live next to the archive.
+        With dedup, files whose content is identical to an earlier file in the output are written as a short
+        reference to that file instead of repeating the content.
+        The config's "compaction" section selects transforms (see compact.py) that shrink files' content;
+        compact=False writes the content verbatim.
+        The config's "size_policies" section skips or truncates large files by pattern (see sizepolicy.py),
+        decided from the walk's stat data before a file is opened.
+        tree_depth and tree_max_entries (default: the config's) limit the File Structure section to that many
+        levels and that many entries per directory; what is left out is summarized as "… 4,312 more files (38 MB)".
+        They do not change which files are collected.
+        detailed_stats also times the pattern matching of the walk (the "match" phase), for --stats reports.
         """
         self.root_dir = root_dir
+        # Directory holding the output file and the local config: the root itself, or an archive's directory.
+        self.base_dir = root_dir
+        self._archive = None
+        if os.path.isfile(root_dir):
+            from .archive import Archive
+            self._archive = Archive(root_dir)
+            self.base_dir = os.path.dirname(root_dir) or "."
+        self.jobs = jobs
+        self.incremental = incremental
+        self.full = full
+        self.max_tokens = max_tokens
+        self._skip_generated = skip_generated
+        self.source = source
+        self.shard_size = parse_shard_size(shard_size) if isinstance(shard_size, str) else shard_size
+        self.output_format = output_format
+        self.dedup = dedup
+        self.compact = compact
+        self._tree_depth = tree_depth
+        self._tree_max_entries = tree_max_entries
+        self._process_pool = None
+        self._process_pool_lock = threading.Lock()
         self.use_global_config = use_global_config
         self.permanent = permanent  # Whether a permanent change is being made
+        self.stats = RunStats()
+        self.stats.detailed = detailed_stats
+        config_start = time.perf_counter()
 
         """
         If ""2gpt ... " and no local config not exits 
@@ -43,6 +121,7 @@ class FileCollector:
 
         else:
             pass
+        self.stats.timings["config"] += time.perf_counter() - config_start
 
 
         # trashs the unpermanent includes/excludes by restoring the includes/excludes
@@ -56,37 +135,79 @@ class FileCollector:
         self.ignore_file = self.config.get("ignore_file", ".gptignore")
         self.include_patterns = set(self.config.get("include_patterns", []))
         self.exclude_patterns = set(self.config.get("exclude_patterns", []))
+        self.priority_patterns = list(self.config.get("priority_patterns", []))
+        self.priority_order = self.config.get("priority_order", "pattern")
+        self.skip_binary = self.config.get("skip_binary", True)
+        self.skip_generated = self.config.get("skip_generated", False) if self._skip_generated is None else self._skip_generated
+        self.compaction = self.config.get("compaction", {}) if self.compact else {}
+        self._compactor = None
+        if self.compaction:
+            from .compact import Compactor
+            self._compactor = Compactor(self.compaction)
+        self.tree_depth = self.config.get("tree_depth") if self._tree_depth is None else self._tree_depth
+        self.tree_max_entries = self.config.get("tree_max_entries") if self._tree_max_entries is None else self._tree_max_entries
+        self.size_policies = self.config.get("size_policies", [])
+        self._size_policies = None
+        if self.size_policies:
+            from .sizepolicy import SizePolicies
+            self._size_policies = SizePolicies(self.size_policies)
 
         # Exclude specific files (self-exclusion)
         self.exclude_patterns.add(self.output_file)
         self.exclude_patterns.add(self.ignore_file)
+        self.exclude_patterns.add(os.path.basename(manifest_path(self.output_file)))
+        self.exclude_patterns.update(shard_patterns(self.output_file))
+        self.exclude_patterns.add(os.path.basename(container_path(self.output_file)))
+
+        # Cached compiled rules and single-pass scan, see rules() and scan()
+        self._rules = None
+        self._scan_result = None
+        self._token_estimates = None
+        self._duplicates = {}
+        self._truncated = {}
+        # Manifest of the previous incremental run, whose sniff results are reused, and the results of this run.
+        self._previous = None
+        self._inspected = {}
+        # Temporary edits as (method name, pattern), re-applied by reload_config().
+        self._temporary_edits = []
+
+    def reload_config(self):
+        """
+        Re-read the local config (e.g. after .gptignore changed on disk) and rebuild the settings from it,
+        keeping the temporary include/exclude edits made so far.
+        """
+        edits = self._temporary_edits
+        if not self.use_global_config and self.local_config_exists():
+            self.config = self.load_local_config()
+        self.reload_settings_from_permanent_config()
+        for method, pattern in edits:
+            getattr(self, method)(pattern)
 
     def local_config_exists(self):
         """Check if the local .gptignore config exists."""
-        local_config_path = os.path.join(self.root_dir, '.gptignore')
+        local_config_path = os.path.join(self.base_dir, '.gptignore')
         return os.path.exists(local_config_path)
 
     def load_global_config(self):
         """Load the global configuration from the package's config.json file."""
         config_path = os.path.join(os.path.dirname(__file__), 'config.json')
         if not os.path.exists(config_path):
-            print(f"Global configuration file not found at {config_path}, using default settings.")
+            logger.warning(f"Global configuration file not found at {config_path}, using default settings.")
             return {}
-        with open(config_path, 'r') as config_file:
-            return json.load(config_file)
+        return load_config_file(config_path)
 
     def load_local_config(self):
         """Load the local .gptignore configuration or create it from the global config if not present."""
-        local_config_path = os.path.join(self.root_dir, '.gptignore')
+        local_config_path = os.path.join(self.base_dir, '.gptignore')
         global_config_path = os.path.join(os.path.dirname(__file__), 'config.json')
 
         if os.path.exists(local_config_path):
             # Load existing local config
-            with open(local_config_path, 'r') as config_file:
-                return json.load(config_file)
+            return load_config_file(local_config_path)
         elif self.permanent:
             # If no local config exists and a permanent change is being made, copy from the global config
-            print(f"Local .gptignore not found. Creating from global config for permanent changes.")
+            logger.info("Local .gptignore not found. Creating from global config for permanent changes.")
+            import shutil
             shutil.copy(global_config_path, local_config_path)
             return self.load_global_config()
         else:
@@ -95,7 +216,7 @@ class FileCollector:
 
     def save_local_config(self):
         """Save the local .gptignore configuration."""
-        local_config_path = os.path.join(self.root_dir, '.gptignore')
+        local_config_path = os.path.join(self.base_dir, '.gptignore')
         with open(local_config_path, 'w') as f:
             json.dump(self.config, f, indent=4)
         print(f"Local configuration saved to {local_config_path}.")
@@ -109,8 +230,11 @@ class FileCollector:
 
     def add_include(self, pattern, permanent=False):     
         """Add a file pattern to the include list."""
+        if not permanent:
+            self._temporary_edits.append(("add_include", pattern))
         if pattern not in self.include_patterns:
             self.include_patterns.add(pattern)
+            self._rules = self._scan_result = None
 
         if permanent:
             if pattern not in self.config['include_patterns']:
@@ -124,8 +248,11 @@ class FileCollector:
 
     def remove_include(self, pattern, permanent=False):
         """Remove a file pattern from the include list."""
+        if not permanent:
+            self._temporary_edits.append(("remove_include", pattern))
         if pattern in self.include_patterns:
             self.include_patterns.remove(pattern)
+            self._rules = self._scan_result = None
         if permanent:
             if pattern in self.config['include_patterns']:
                 self.config['include_patterns'].remove(pattern)
@@ -137,8 +264,11 @@ class FileCollector:
 
     def add_exclude(self, pattern, permanent=False):
         """Add a file pattern to the exclude list."""
+        if not permanent:
+            self._temporary_edits.append(("add_exclude", pattern))
         if pattern not in self.exclude_patterns:
             self.exclude_patterns.add(pattern)
+            self._rules = self._scan_result = None
         if permanent:
             if pattern not in self.config['exclude_patterns']:
                 self.config['exclude_patterns'].append(pattern)
@@ -151,8 +281,11 @@ class FileCollector:
 
     def remove_exclude(self, pattern, permanent=False):
         """Remove a file pattern from the exclude list."""
+        if not permanent:
+            self._temporary_edits.append(("remove_exclude", pattern))
         if pattern in self.exclude_patterns:
             self.exclude_patterns.remove(pattern)
+            self._rules = self._scan_result = None
         if permanent:
             if pattern in self.config['exclude_patterns']:
                 self.config['exclude_patterns'].remove(pattern)
@@ -175,22 +308,412 @@ class FileCollector:
             print(f"  {pattern}")
 
 
+    def output_path(self):
+        """
+        Return the output file resolved against base_dir (an absolute output_file is used as is). Archives
+        in one directory must not share an output, so an archive's is named after it (a.whl.allfiles.txt).
+        """
+        if self._archive is not None:
+            head, tail = os.path.split(self.output_file)
+            return os.path.join(self.base_dir, head, f"{os.path.basename(self.root_dir)}.{tail}")
+        return os.path.join(self.base_dir, self.output_file)
+
+    def close(self):
+        """Close the archive of an archive root; the collector must not be used afterwards."""
+        if self._archive is not None:
+            self._archive.close()
+
+    def rules(self):
+        """Return the include/exclude patterns compiled into a RuleSet, built once per set of patterns."""
+        if self._rules is None:
+            self._rules = compiled_rules(frozenset(self.include_patterns), tuple(self._ordered_exclude_patterns()))
+        return self._rules
+
+    def _ordered_exclude_patterns(self):
+        """
+        Exclude patterns in evaluation order, which matters for '!' negations: the config's order first,
+        then self-exclusions and patterns added for this run.
+        """
+        configured = [p for p in self.config.get("exclude_patterns", []) if p in self.exclude_patterns]
+        return configured + sorted(self.exclude_patterns.difference(configured))
+
+    def scan(self):
+        """
+        Walk the root directory once and cache the tree section and the files to collect.
+        generate_tree() and collect_files() both work from this result, so a run only traverses the tree once.
+        """
+        if self._scan_result is None:
+            match_before = self.stats.timings["match"]
+            limits = dict(max_depth=self.tree_depth, max_entries=self.tree_max_entries)
+            with self.stats.phase("walk"):
+                relpaths = self._tracked_files() if self.source == "git" and self._archive is None else None
+                if self._archive is not None:
+                    self._scan_result = scan_paths(self.root_dir, self._archive.relpaths(), self.rules(), self.stats,
+                                                   stat=self._archive.stat, **limits)
+                elif relpaths is not None:
+                    self._scan_result = scan_paths(self.root_dir, relpaths, self.rules(), self.stats, **limits)
+                else:
+                    self._scan_result = scan_tree(self.root_dir, self.rules(), self.stats, **limits)
+            # Report traversal and pattern matching separately.
+            self.stats.timings["walk"] -= self.stats.timings["match"] - match_before
+        return self._scan_result
+
+    def selected_files(self):
+        """
+        Return the scanned files that end up in the output: size policies are applied from the files' stat data,
+        binary (and optionally minified or generated) files are dropped after sniffing their first bytes,
+        then the token budget is applied.
+        """
+        files = self._apply_size_policies(self.scan().files)
+        self._token_estimates = None
+        self._duplicates = {}
+        self._inspected = {}
+        if not (self.skip_binary or self.skip_generated or self._wants_token_estimates()):
+            self._prefetch_archive(files)
+            return self._find_duplicates(files)
+
+        kept = []
+        estimates = {}
+        skipped = {}  # kind -> [files, bytes]
+        for entry, (kind, tokens) in zip(files, ordered_map(self._inspect_file, files, self.jobs)):
+            self._inspected[entry.path] = (entry.size, entry.mtime_ns, kind, tokens)
+            if kind is not None and (self.skip_binary if kind == BINARY else self.skip_generated):
+                counts = skipped.setdefault(kind, [0, 0])
+                counts[0] += 1
+                counts[1] += entry.size
+                continue
+            kept.append(entry)
+            estimates[entry.path] = tokens
+        for kind, (count, size) in sorted(skipped.items()):
+            logger.info(f"Skipped {count} {kind} files ({size} bytes).")
+            self.stats.add(files_skipped=count)
+
+        if self._wants_token_estimates():
+            self._token_estimates = estimates
+        if self.max_tokens is not None:
+            kept = self._apply_token_budget(kept, estimates)
+            self.stats.add(files_skipped=len(estimates) - len(kept))
+        self._prefetch_archive(kept)
+        return self._find_duplicates(kept)
+
+    def _apply_size_policies(self, files):
+        """
+        Decide the size policy of every file from its size alone: files a policy skips are dropped, the ones it
+        truncates are recorded in self._truncated. Returns the remaining files.
+        """
+        self._truncated = {}
+        if self._size_policies is None:
+            return files
+        from .sizepolicy import SKIP
+
+        kept = []
+        skipped_count = skipped_bytes = omitted = 0
+        for entry in files:
+            policy = self._size_policies.decide(os.path.basename(entry.path), entry.size)
+            if policy is not None and policy.action == SKIP:
+                logger.debug(f"Skipping {entry.path} ({entry.size} bytes, over {policy.max_size} for {policy.pattern}).")
+                skipped_count += 1
+                skipped_bytes += entry.size
+                continue
+            if policy is not None:
+                self._truncated[entry.path] = policy
+                omitted += entry.size - policy.head - policy.tail
+            kept.append(entry)
+        if skipped_count:
+            logger.info(f"Skipped {skipped_count} files over their size limit ({skipped_bytes} bytes).")
+            self.stats.add(files_skipped=skipped_count)
+        if self._truncated:
+            logger.info(f"Truncated {len(self._truncated)} large files, {omitted} bytes not read.")
+            self.stats.add(files_truncated=len(self._truncated))
+        return kept
+
+    def _emitted_size(self, entry):
+        """Number of bytes of a file that are read for the output."""
+        policy = self._truncated.get(entry.path)
+        return entry.size if policy is None else policy.head + policy.tail
+
+    def _find_duplicates(self, files):
+        """With dedup, record which of the selected files repeat an earlier file's content; returns files."""
+        if self.dedup:
+            from .dedup import find_duplicates
+            # Truncated files show only part of their content, so they are neither duplicates nor originals.
+            self._duplicates = find_duplicates([entry for entry in files if entry.path not in self._truncated], self.jobs,
+                                               self._open)
+            # A reference that is not shorter than the content it replaces saves nothing.
+            sizes = {entry.path: entry.size for entry in files}
+            self._duplicates = {path: original for path, original in self._duplicates.items()
+                                if len(_duplicate_reference(original)) < sizes[path]}
+            if self._duplicates:
+                saved = sum(sizes[path] - len(_duplicate_reference(original))
+                            for path, original in self._duplicates.items())
+                logger.info(f"Deduplicated {len(self._duplicates)} files, {saved} bytes saved.")
+                self.stats.add(files_deduplicated=len(self._duplicates), bytes_deduplicated=saved)
+        return files
+
+    def _wants_token_estimates(self):
+        return self.max_tokens is not None or (self.shard_size is not None and self.shard_size[1] == "tokens")
+
+    def _inspect_file(self, entry):
+        """
+        Read the head of a file once and return its sniffed kind and estimated token count (None if no estimate
+        is needed). Unchanged files of an incremental run reuse the previous run's results without being opened.
+        """
+        wants_tokens = self._wants_token_estimates()
+        if self._previous is not None:
+            known = self._previous.inspection(entry)
+            if known is not None and (known[1] is not None or not wants_tokens):
+                return known
+        try:
+            with self.stats.phase("read"):
+                sample = self._read_head(entry.path)
+        except OSError:
+            return None, 0
+        tokens = estimate_file_tokens(entry.path, self._emitted_size(entry), sample) if wants_tokens else None
+        return sniff(sample), tokens
+
+    def _apply_token_budget(self, files, estimates):
+        """Pack files into self.max_tokens by priority and report what was dropped."""
+        tree_tokens = self._tree_tokens()
+        prioritizer = Prioritizer(self.priority_patterns, self.priority_order)
+        kept, dropped = pack(files, estimates, self.max_tokens - tree_tokens, prioritizer)
+
+        kept_tokens = tree_tokens + sum(estimates[entry.path] for entry in kept)
+        logger.info(f"Token budget: ~{kept_tokens} of {self.max_tokens} tokens used by {len(kept)} files.")
+        if dropped:
+            dropped_tokens = sum(estimates[entry.path] for entry in dropped)
+            logger.warning(f"Dropped {len(dropped)} files (~{dropped_tokens} tokens) to stay within the budget of {self.max_tokens} tokens.")
+            for entry in dropped:
+                logger.info(f"  dropped {entry.path} (~{estimates[entry.path]} tokens)")
+        return kept
+
+    def _prefetch_archive(self, files):
+        """
+        Let an archive root read the given files in one pass, in archive order (see Archive.prefetch). Called with
+        the files left after sniffing and the token budget, so that only the output's files are spooled.
+        """
+        if self._archive is not None:
+            self._archive.prefetch(entry.relpath for entry in files)
+
+    def _read_head(self, path):
+        """Return the first SNIFF_SIZE bytes of a collected file."""
+        if self._archive is not None:
+            return self._archive.read_head(os.path.relpath(path, self.root_dir).replace(os.sep, "/"))
+        with open(path, 'rb') as f:
+            return f.read(SNIFF_SIZE)
+
+    def _open(self, path):
+        """Open a collected file (a FileEntry path) for binary reading, from the archive if the root is one."""
+        if self._archive is not None:
+            return self._archive.open(os.path.relpath(path, self.root_dir).replace(os.sep, "/"))
+        return open(path, 'rb')
+
+    def _tracked_files(self):
+        """Return the files tracked in the git index below root_dir, or None to fall back to walking the directory."""
+        from .gitindex import GitIndexError, tracked_files
+        try:
+            relpaths = tracked_files(self.root_dir)
+        except GitIndexError as e:
+            logger.warning(f"Cannot use the git index ({e}), walking the directory instead.")
+            return None
+        if relpaths is None:
+            logger.info(f"{self.root_dir} is not inside a git repository, walking the directory instead.")
+        return relpaths
+
     def generate_tree(self):
         """Generate the directory tree and write it to the output file."""
-        tree = DirectoryTree(root_dir=self.root_dir, exclude_dirs=[], exclude_files=self.exclude_patterns) #exclude_files works also with directorys
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write("File Structure:\n")
-            f.write(json.loads(tree.to_json())["tree_print"])
-            f.write("\n\n")
+        with open(self.output_path(), 'wb') as f:
+            self._write_tree(f)
 
     def collect_files(self):
         """Collect files based on inclusion and exclusion patterns."""
+        with open(self.output_path(), 'ab') as f:
+            self._write_blocks(f, self.selected_files())
+
+    def _tree_tokens(self):
+        """Estimate the tokens of the File Structure section, a chunk at a time."""
+        return int(sum(estimate_text_tokens(chunk) for chunk in self.scan().tree.chunks()))
+
+    def _write_tree(self, f):
+        """Write the File Structure section to the binary file f."""
+        tree = self.scan().tree
+        with self.stats.phase("tree"):
+            tree.write_to(f)
+        self.stats.add(bytes_out=tree.size)
+
+    def iter_files(self, files=None):
+        """
+        Yield a CollectedFile (relpath, size, chunks, path, duplicate_of) for every file of the output, in output
+        order, without writing anything. chunks iterates over the file's content as UTF-8 bytes, decoded like the
+        output file would have it; it is empty for empty or unreadable files, which get no block in the output.
+        With dedup, duplicate_of is the path of an earlier file with the same content and chunks is empty.
+        Consume chunks before advancing to the next file: small files are read ahead on self.jobs threads,
+        bigger ones are streamed.
+
+            for item in FileCollector("src").iter_files():
+                upload(item.relpath, b"".join(item.chunks))
+        """
+        if files is None:
+            files = self.selected_files()
+        else:
+            self._prefetch_archive(files)
+        try:
+            for entry, _, _, chunks in self._iter_sources(files):
+                yield CollectedFile(entry.relpath, entry.size, iter(chunks), entry.path, self._duplicates.get(entry.path))
+        finally:
+            self._shutdown_process_pool()
+
+    def write_to(self, f):
+        """Write the complete plain-text output (tree and blocks) to the binary file object f, e.g. sys.stdout.buffer."""
+        try:
+            self._write_tree(f)
+            self._write_blocks(f, self.selected_files())
+        finally:
+            self._shutdown_process_pool()
+
+    def _iter_sources(self, files, previous=None, old_output=None, track=False, jobs=None):
+        """
+        Yield (entry, record, hasher, chunks) for files in order, reading them on up to jobs (default self.jobs) threads.
+        chunks is the file's content, or with a previous Manifest the whole block of an unchanged file (then record
+        is its ManifestEntry) copied from old_output. With track, the content read is fed into hasher.
+        """
+        duplicates = self._duplicates
+        compactor = self._compactor
+        truncated = self._truncated
+
+        def produce(entry):
+            duplicate_of = duplicates.get(entry.path)
+            record = previous.reusable(entry, duplicate_of) if previous is not None else None
+            if record is not None:
+                return record, None, iter_file_range(old_output, record.offset, record.length)
+            if duplicate_of is not None:
+                return None, None, []
+            hasher = hashlib.blake2b(digest_size=16) if track else None
+            policy = truncated.get(entry.path)
+            if policy is not None:
+                chunks = self._iter_partial_content(entry, policy, hasher)
+            else:
+                chunks = self._iter_file_content(entry.path, hasher)
+            transforms = compactor.transforms_for(os.path.basename(entry.path)) if compactor is not None else ()
+            if transforms:
+                return None, hasher, self._compact_file(entry, chunks, transforms)
+            return None, hasher, self._prefetch_content(chunks, self._emitted_size(entry))
+
+        results = ordered_map(produce, files, self.jobs if jobs is None else jobs)
+        for entry in files:
+            yield (entry,) + next(results)
+
+    def _compact_file(self, entry, chunks, transforms):
+        """
+        Read a file's content chunks completely and return the content after the compaction transforms as a chunk list.
+        Big files go to a process pool when self.jobs > 1 so transforms of several files run in parallel.
+        Files with only streamable transforms are compacted while they are streamed instead, and files over
+        MAX_COMPACT_SIZE with other transforms are written as they are.
+        """
+        from .compact import MAX_COMPACT_SIZE, PROCESS_THRESHOLD, compact as compact_content, is_streamable
+        if is_streamable(transforms):
+            return self._compact_stream(self._prefetch_content(chunks, self._emitted_size(entry)), transforms)
+        if self._emitted_size(entry) > MAX_COMPACT_SIZE:
+            logger.info(f"Not compacting {entry.path}: {', '.join(transforms)} need the whole file in memory "
+                        f"and it is over {MAX_COMPACT_SIZE} bytes.")
+            return self._prefetch_content(chunks, self._emitted_size(entry))
+        data = b"".join(chunks)
+        if not data:
+            return []
+        with self.stats.phase("compact"):
+            if self.jobs > 1 and len(data) >= PROCESS_THRESHOLD:
+                result = self._get_process_pool().submit(compact_content, data, entry.path, transforms).result()
+            else:
+                result = compact_content(data, entry.path, transforms)
+        self.stats.add(files_compacted=1, compacted_bytes_in=len(data), compacted_bytes_out=len(result))
+        return [result] if result else []
+
+    def _get_process_pool(self):
+        with self._process_pool_lock:
+            if self._process_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Worker threads are running, so the processes are spawned rather than forked.
+                self._process_pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+
+    def _shutdown_process_pool(self):
+        """Stop the compaction processes and close the archive handles opened by reader threads."""
+        with self._process_pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+        if self._archive is not None:
+            self._archive.release()
+
+    def _compact_stream(self, chunks, transforms):
+        """Yield the chunks after streamable compaction transforms, counting them into the compaction stats."""
+        from .compact import compact_stream
+        size_in = size_out = 0
+
+        def counted(chunks):
+            nonlocal size_in
+            for chunk in chunks:
+                size_in += len(chunk)
+                yield chunk
+
+        for chunk in compact_stream(counted(chunks), transforms):
+            size_out += len(chunk)
+            yield chunk
+        if size_in:
+            self.stats.add(files_compacted=1, compacted_bytes_in=size_in, compacted_bytes_out=size_out)
+
+    def _write_blocks(self, f, files, previous=None, old_output=None, track=False, jobs=None):
+        """
+        Write the blocks of files to the binary file f in order and return a ManifestEntry per file.
+        Files are read on up to jobs (default self.jobs) threads while the blocks are written here in scan order.
+        With track, every file's content is hashed (the entries' hash is None otherwise);
+        with a previous Manifest, blocks of unchanged files are copied from old_output instead of re-reading the file.
+        """
+        records = []
+        reused = referenced = 0
+        try:
+            offset = f.tell()
+        except OSError:
+            # Pipes (--stdout) cannot tell; offsets are then only relative to the first block.
+            offset = 0
+        sources = self._iter_sources(files, previous, old_output, track, jobs)
+        for entry in files:
+            with self.stats.phase("read"):
+                _, record, hasher, chunks = next(sources)
+                duplicate_of = self._duplicates.get(entry.path)
+                if record is not None:
+                    reused += 1
+                    chunks = iter(chunks)
+                elif duplicate_of is not None:
+                    referenced += 1
+                    chunks = self._frame_block(entry.path, [_duplicate_reference(duplicate_of)])
+                else:
+                    chunks = self._frame_block(entry.path, chunks)
+            start = offset
+            while True:
+                with self.stats.phase("read"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with self.stats.phase("write"):
+                    f.write(chunk)
+                offset += len(chunk)
+            self.stats.add(files_included=1, bytes_in=entry.size, bytes_out=offset - start)
+            digest = record.hash if record is not None else hasher.hexdigest() if hasher is not None else None
+            records.append(ManifestEntry(entry.path, entry.size, entry.mtime_ns, digest, start, offset - start,
+                                         duplicate_of))
+        # Blocks copied from old_output and duplicates written as a reference, for the incremental run's log.
+        self._blocks_reused, self._blocks_referenced = reused, referenced
+        return records
+
+    def _legacy_collect_files(self):
+        """Previous os.walk based collection, kept as the baseline for --profile."""
+        import fnmatch
+        import re
         include_patterns = self._compile_patterns(list(self.include_patterns))
         exclude_patterns = self._compile_patterns(list(self.exclude_patterns))
-        print(f"Include patterns: {include_patterns}")  # Debugging line
-        print(f"Exclude patterns: {exclude_patterns}")  # Debugging line
-
-        with open(self.output_file, 'a') as f:
+        collected = []
+        with open(self.output_path(), 'ab') as f:
             for root, dirs, files in os.walk(self.root_dir):
                 print(f"Walking directory: {root}")  # Debugging line
                 dirs[:] = [d for d in dirs if d not in self.exclude_patterns and not any(fnmatch.fnmatch(d, pattern) for pattern in self.exclude_patterns)]
@@ -198,76 +721,440 @@ class FileCollector:
                     print(f"Processing file: {file}")  # Debugging line
                     if any(re.match(pattern, file) for pattern in include_patterns) and not any(re.match(pattern, file) for pattern in exclude_patterns):
                         file_path = os.path.join(root, file)
-                        print(f"Including file for content collection: {file_path}")
+                        collected.append(file_path)
                         self._append_file_content(f, file_path)
+        return collected
 
     def _compile_patterns(self, patterns):
         """Compile wildcard patterns into regular expressions."""
+        import fnmatch
         return [fnmatch.translate(pattern) for pattern in patterns]
 
-    def _append_file_content(self, file, file_path):
-        """Append file content to the output."""
-        print(f"Attempting to append content from: {file_path}")  # Debugging line
+    def _iter_file_content(self, file_path, hasher=None):
+        """
+        Yield the content of a file as UTF-8 encoded chunks, streaming it so memory stays flat.
+        Nothing is yielded for empty or unreadable files. The raw file content is fed into hasher if given.
+        """
+        logger.debug(f"Reading {file_path}")
         try:
-            with open(file_path, 'r', errors='ignore') as f:
-                content = f.read()
-                if not content:
-                    print(f"File {file_path} is empty or unreadable.")
-                else:
-                    print(f"Read content from {file_path}: {content[:100]}")  # First 100 chars of content
-                    file.write(f"----- START OF {file_path} -----\n")
-                    file.write(content)
-                    file.write(f"\n----- END OF {file_path} -----\n\n\n")
+            with self._open(file_path) as f:
+                chunks = iter_text_chunks(HashingReader(f, hasher) if hasher is not None else f)
+                first = next(chunks, None)
+                if first is None:
+                    logger.debug(f"File {file_path} is empty or unreadable.")
+                    return
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Read content from {file_path}: {first[:100].decode('utf-8', 'ignore')!r}")
+                yield first
+                yield from chunks
+        except Exception as e:
+            logger.warning(f"Error appending content from {file_path}: {e}")
+
+    def _frame_block(self, file_path, chunks):
+        """Wrap content chunks in the START/END markers of the output; nothing is yielded for empty content."""
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return
+        start, end = _block_markers(file_path)
+        yield start
+        yield first
+        yield from chunks
+        yield end
+
+    def _iter_file_block(self, file_path, hasher=None):
+        """Yield the output block of a file as UTF-8 encoded chunks (nothing for empty or unreadable files)."""
+        return self._frame_block(file_path, self._iter_file_content(file_path, hasher))
+
+    def _iter_partial_content(self, entry, policy, hasher=None):
+        """
+        Yield the parts of a file that a head or head_tail size policy keeps, seeking past the rest, with an
+        elision marker where bytes were left out. Parts are decoded separately, so a character cut at a part's
+        boundary is dropped. The bytes read are fed into hasher if given.
+        """
+        from .sizepolicy import elision_marker, emitted_ranges
+        logger.debug(f"Reading {entry.path} partially ({policy.action} policy for {policy.pattern})")
+        try:
+            with self._open(entry.path) as f:
+                position = 0
+                for offset, length in emitted_ranges(policy, entry.size):
+                    if offset > position:
+                        yield elision_marker(offset - position)
+                    f.seek(offset)
+                    reader = LimitedReader(f, length)
+                    yield from iter_text_chunks(HashingReader(reader, hasher) if hasher is not None else reader)
+                    position = offset + length
+                if entry.size > position:
+                    yield elision_marker(entry.size - position)
         except Exception as e:
-            print(f"Error appending content from {file_path}: {e}")
+            logger.warning(f"Error appending content from {entry.path}: {e}")
+
+    def _prefetch_content(self, chunks, size):
+        """Read a small file's content chunks completely (on a worker thread); large files stay lazy and are streamed by the consumer."""
+        if size <= PREFETCH_LIMIT:
+            content = b"".join(chunks)
+            return [content] if content else []
+        return chunks
+
+    def _append_file_content(self, file, file_path):
+        """Append file content to the output (opened in binary mode)."""
+        for chunk in self._iter_file_block(file_path):
+            file.write(chunk)
 
     def run(self):
         """Run the file collection process."""
-        self.generate_tree()
-        self.collect_files()
+        self._scan_result = None
+        compacted_before = (self.stats.counters["compacted_bytes_in"], self.stats.counters["compacted_bytes_out"])
+        try:
+            self._run()
+        finally:
+            self._shutdown_process_pool()
+        if self._compactor is not None:
+            before = self.stats.counters["compacted_bytes_in"] - compacted_before[0]
+            after = self.stats.counters["compacted_bytes_out"] - compacted_before[1]
+            logger.info(f"Compaction: {before} bytes -> {after} bytes ({before - after} bytes saved).")
+
+    def _run(self):
+        if self.output_format == "indexed":
+            if self.incremental or self.shard_size is not None:
+                logger.warning("--incremental and --shard-size are not supported with --format indexed, ignoring them.")
+            self._run_indexed()
+        elif self.shard_size is not None:
+            if self.incremental:
+                logger.warning("--incremental is not supported with --shard-size, rebuilding all shards.")
+            self._run_sharded()
+        elif self.incremental:
+            self._run_incremental()
+        else:
+            with open(self.output_path(), 'wb') as f:
+                self.write_to(f)
+
+    def _run_indexed(self):
+        """
+        Write the output as an indexed container: the plain-text output framed by a header and followed by a
+        hash table mapping each path to the offset, length and hash of its content.
+        """
+        from .container import HEADER, IndexEntry, write_index as write_container_index
+        files = self.selected_files()
+        path = container_path(self.output_path())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"\0" * HEADER.size)
+            self._write_tree(f)
+            records = self._write_blocks(f, files, track=True)
+            data_length = f.tell() - HEADER.size
+            entries = []
+            for record in records:
+                if not record.length or record.duplicate_of is not None:
+                    continue
+                header_length, footer_length = map(len, _block_markers(record.path))
+                entries.append(IndexEntry(record.path, record.offset - HEADER.size + header_length,
+                                          record.length - header_length - footer_length, record.hash))
+            # Duplicates resolve to the content of the file they refer to.
+            by_path = {entry.path: entry for entry in entries}
+            for record in records:
+                original = by_path.get(record.duplicate_of)
+                if original is not None:
+                    entries.append(original._replace(path=record.path))
+            write_container_index(f, HEADER.size, data_length, entries)
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote indexed container {path} with {len(entries)} files.")
+
+    def _block_estimates(self, files, unit):
+        """Upper bound of each file's block size in bytes, or its estimated tokens."""
+        if unit == "tokens":
+            estimates = self._token_estimates
+            if estimates is None or not all(entry.path in estimates for entry in files):
+                estimates = dict(zip((entry.path for entry in files), ordered_map(
+                    lambda entry: estimate_file_tokens(entry.path, self._emitted_size(entry), open_file=self._open),
+                    files, self.jobs)))
+            return estimates
+        # Decoding only ever drops bytes, so the bytes read plus the markers are an upper bound (compaction
+        # can grow a file, e.g. by re-indenting JSON; RollingWriter still keeps the shards within the limit).
+        def block_size(entry):
+            duplicate_of = self._duplicates.get(entry.path)
+            policy = self._truncated.get(entry.path)
+            if duplicate_of is not None:
+                content = len(_duplicate_reference(duplicate_of))
+            elif policy is not None:
+                from .sizepolicy import elision_marker, emitted_ranges
+                content = position = 0
+                for offset, length in emitted_ranges(policy, entry.size):
+                    if offset > position:
+                        content += len(elision_marker(offset - position))
+                    content += length
+                    position = offset + length
+                if entry.size > position:
+                    content += len(elision_marker(entry.size - position))
+            else:
+                content = entry.size
+            return content + sum(map(len, _block_markers(entry.path)))
+        return {entry.path: block_size(entry) for entry in files}
+
+    def _run_sharded(self):
+        """
+        Write the output as numbered shards (allfiles.001.txt, ...) of at most self.shard_size, plus an index
+        mapping every file to its shard(s). Blocks are only split when a single file exceeds a shard.
+        Shards are written concurrently to temporary files and renamed into place once all are done.
+        """
+        limit, unit = self.shard_size
+        output = self.output_path()
+        files = self.selected_files()
+        estimates = self._block_estimates(files, unit)
+        first_size = self._tree_tokens() if unit == "tokens" else self.scan().tree.size
+        groups = plan_shards(files, estimates, limit, first_size)
+
+        def write_group(numbered):
+            number, (group, oversized) = numbered
+            # Byte limits are enforced on every shard, so a block bigger than estimated (or a tree bigger than
+            # a shard) is split rather than overflowing. Token limits are turned into bytes with the ratio of
+            # the oversized file, or of the tree when it fills the first shard by itself.
+            part_limit = limit if unit == "bytes" else None
+            if unit == "tokens" and oversized:
+                entry = group[0]
+                part_limit = max(1, int(limit * entry.size / max(1, estimates[entry.path])))
+            elif unit == "tokens" and number == 0 and first_size > limit:
+                part_limit = max(1, int(limit * self.scan().tree.size / first_size))
+            writer = RollingWriter(lambda part: open(f"{output}.shard-{number}-{part}.tmp", 'wb'), part_limit)
+            try:
+                if number == 0:
+                    self._write_tree(writer)
+                records = self._write_blocks(writer, group, jobs=1)
+            finally:
+                writer.close()
+            return writer.parts, records
+
+        from concurrent.futures import ThreadPoolExecutor
+        workers = min(len(groups), max(self.jobs, 4))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(write_group, enumerate(groups)))
+
+        shards = []
+        file_shards = {}
+        for parts, records in written:
+            names = []
+            for part in parts:
+                name = shard_name(output, len(shards) + 1)
+                os.replace(part, name)
+                shards.append(os.path.basename(name))
+                names.append(os.path.basename(name))
+            for record in records:
+                if record.length:
+                    file_shards[record.path] = names[0] if len(names) == 1 else names
+        # Drop shards left over from an earlier, bigger run.
+        number = len(shards) + 1
+        while os.path.exists(shard_name(output, number)):
+            os.remove(shard_name(output, number))
+            number += 1
+        write_index(output, shards, file_shards)
+        logger.info(f"Wrote {len(shards)} shards and {index_name(output)}.")
+
+    def _manifest_options(self):
+        """Settings that change the bytes of a block; a manifest written with other options is not reused."""
+        options = {"block_format": 1}
+        if self.compaction:
+            options["compaction"] = self.compaction
+        if self.size_policies:
+            options["size_policies"] = self.size_policies
+        return options
+
+    def _run_incremental(self):
+        """
+        Rebuild the output reusing the blocks of unchanged files recorded in the manifest, then refresh the manifest.
+        The new output is written to a temporary file and moved into place, so it is identical to a full rebuild.
+        """
+        options = self._manifest_options()
+        output = self.output_path()
+        previous = None if self.full else Manifest.load(output, options)
+        self._previous = previous
+        try:
+            files = self.selected_files()
+        finally:
+            self._previous = None
+        started_ns = time.time_ns()
+        tmp_path = output + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            old_output = open(output, 'rb') if previous is not None else None
+            try:
+                self._write_tree(out)
+                records = self._write_blocks(out, files, previous, old_output, track=True)
+            finally:
+                if old_output is not None:
+                    old_output.close()
+        os.replace(tmp_path, output)
+        Manifest(records, started_ns, options, self._inspected).save(output)
+
+        reused, referenced = self._blocks_reused, self._blocks_referenced
+        logger.info(f"Incremental run: {reused} unchanged blocks copied, {len(files) - reused - referenced} files read"
+                    + (f", {referenced} duplicates referenced." if referenced else "."))
+
+    def profile(self):
+        """
+        Time the previous os.walk based collection against the single-pass scan and print a comparison.
+        Both variants write the output file; the single-pass run goes last so its output is the one left behind.
+        Debug output is discarded while timing so terminal I/O does not skew the numbers.
+        """
+        from contextlib import redirect_stdout
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            legacy_files = self._legacy_collect_files()
+            legacy_collect = time.perf_counter() - start
+
+            self._rules = self._scan_result = None
+            start = time.perf_counter()
+            result = self.scan()
+            single_scan = time.perf_counter() - start
+            start = time.perf_counter()
+            self.generate_tree()
+            self.collect_files()
+            single_write = time.perf_counter() - start
+
+        print("Profile (seconds):")
+        print(f"  os.walk collect:              {legacy_collect:.4f}")
+        print(f"  single-pass scan:             {single_scan:.4f}")
+        print(f"  single-pass tree + collect:   {single_write:.4f}")
+        print(f"  total: os.walk {legacy_collect:.4f} vs single-pass {single_scan + single_write:.4f}")
+        if sorted(legacy_files) != sorted(entry.path for entry in result.files):
+            print("  warning: the two paths selected different files.")
+        print(f"  files collected: {len(result.files)}")
+
+
+EDIT_COMMANDS = ("include", "exclude", "remove-include", "remove-exclude")
 
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description="FileCollector CLI to manage file inclusion and exclusion.")
     subparsers = parser.add_subparsers(dest="command", help="Sub-command help")
    
     # Add global config option
+    parser.add_argument('--root', default='.', metavar='PATH', help='Directory or zip/tar archive to collect (default: the current directory). A compressed tar is decompressed to a temporary spool holding the selected files, on disk once it exceeds 32 MB.')
     parser.add_argument('--global-config', action='store_true', help='Apply changes to the global config instead of the local config.')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N', help='Read files on N threads (output is identical to the serial mode).')
+    parser.add_argument('--incremental', action='store_true', help='Keep a manifest next to the output and only re-read changed files on later runs.')
+    parser.add_argument('--full', action='store_true', help='With --incremental, ignore the manifest and rebuild everything.')
+    parser.add_argument('--max-tokens', type=int, metavar='N', help='Keep the estimated token count of the output below N, dropping low-priority files.')
+    parser.add_argument('--skip-generated', action='store_true', default=None, help='Also skip minified and generated files.')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='Log progress (-v) or every file (-vv).')
+    parser.add_argument('--stats', action='store_true', help='Print phase timings, file and byte counts after the run.')
+    parser.add_argument('--stats-json', metavar='PATH', help='Write the run statistics as JSON to PATH.')
+    parser.add_argument('--source', choices=['fs', 'git'], default='fs', help="List candidate files by walking the directory (fs) or from the git index (git).")
+    parser.add_argument('--shard-size', type=parse_shard_size, metavar='SIZE', help="Split the output into shards of at most SIZE bytes (e.g. 10MB) or tokens (e.g. 100k tokens).")
+    parser.add_argument('--format', dest='output_format', choices=['text', 'indexed'], default='text', help='Write plain text or an indexed container with O(1) per-file lookups.')
+    parser.add_argument('--dedup', action='store_true', help='Write files with the same content as an earlier file as a reference to it.')
+    parser.add_argument('--no-compact', dest='compact', action='store_false', help="Ignore the config's compaction transforms and write contents verbatim.")
+    parser.add_argument('--tree-depth', type=int, metavar='N', help="Show N directory levels in the File Structure section and summarize deeper ones.")
+    parser.add_argument('--tree-max-entries', type=int, metavar='N', help="Show at most N entries per directory in the File Structure section and summarize the rest.")
+    parser.add_argument('--stdout', action='store_true', help='Write the output to stdout instead of the output file.')
+    parser.add_argument('--profile', action='store_true', help='Time the single-pass scan against the previous os.walk collection.')
 
     # Add subcommand for including files
     include_parser = subparsers.add_parser("include", help="Add a file or directory to the include list.")
     include_parser.add_argument("pattern", help="Pattern to include (e.g., '*.py').")
     include_parser.add_argument("--permanent", action="store_true", help="Make the inclusion permanent.")
+    include_parser.add_argument("--run", action="store_true", help="Also run the collection after a permanent change.")
 
     # Add subcommand for excluding files
     exclude_parser = subparsers.add_parser("exclude", help="Add a file or directory to the exclude list.")
     exclude_parser.add_argument("pattern", help="Pattern to exclude (e.g., '*.png').")
     exclude_parser.add_argument("--permanent", action="store_true", help="Make the exclusion permanent.")
+    exclude_parser.add_argument("--run", action="store_true", help="Also run the collection after a permanent change.")
 
     # Add subcommand for removing from include list
     remove_include_parser = subparsers.add_parser("remove-include", help="Remove a file from the include list.")
     remove_include_parser.add_argument("pattern", help="Pattern to remove from include list.")
     remove_include_parser.add_argument("--permanent", action="store_true", help="Remove permanently from config.")
+    remove_include_parser.add_argument("--run", action="store_true", help="Also run the collection after a permanent change.")
 
     # Add subcommand for removing from exclude list
     remove_exclude_parser = subparsers.add_parser("remove-exclude", help="Remove a file from the exclude list.")
     remove_exclude_parser.add_argument("pattern", help="Pattern to remove from exclude list.")
     remove_exclude_parser.add_argument("--permanent", action="store_true", help="Remove permanently from config.")
+    remove_exclude_parser.add_argument("--run", action="store_true", help="Also run the collection after a permanent change.")
+
+    # Add subcommand for keeping the output up to date
+    watch_parser = subparsers.add_parser("watch", help="Stay resident and rebuild the output whenever files change.")
+    watch_parser.add_argument("--debounce", type=float, default=0.2, metavar="SECONDS", help="Wait until no change was seen for SECONDS before rebuilding (default: 0.2).")
+    watch_parser.add_argument("--poll", action="store_true", help="Poll mtimes instead of using inotify.")
+    watch_parser.add_argument("--poll-interval", type=float, default=1.0, metavar="SECONDS", help="Polling interval (default: 1.0).")
+
+    # Add subcommand for collecting several roots in one process
+    batch_parser = subparsers.add_parser("batch", help="Collect several root directories in one process, each into its own output file.")
+    batch_parser.add_argument("roots", nargs="*", help="Root directories or zip/tar archives.")
+    batch_parser.add_argument("--from", dest="roots_file", metavar="FILE", help="Read root directories from FILE, one per line.")
+    batch_parser.add_argument("--workers", type=int, metavar="N", help="Process N roots at a time (default: one per CPU).")
+
+    # Add subcommand for converting an indexed container back to plain text
+    to_text_parser = subparsers.add_parser("to-text", help="Convert an indexed container (.2gpt) to the plain-text format.")
+    to_text_parser.add_argument("container", help="Container written with --format indexed.")
+    to_text_parser.add_argument("output", nargs="?", help="Plain-text file to write (default: the container name with .txt).")
 
     # Add subcommand for listing includes and excludes
-    subparsers.add_parser("list-includes", help="List all permanently included files.")
-    subparsers.add_parser("list-excludes", help="List all permanently excluded files.")
+    for name, help_text in (("list-includes", "List all permanently included files."),
+                            ("list-excludes", "List all permanently excluded files.")):
+        list_parser = subparsers.add_parser(name, help=help_text)
+        list_parser.add_argument("--run", action="store_true", help="Also run the collection.")
 
     args = parser.parse_args()
+    if (args.tree_depth is not None and args.tree_depth < 0) or (args.tree_max_entries is not None and args.tree_max_entries < 0):
+        parser.error("--tree-depth and --tree-max-entries cannot be negative.")
+    logging.basicConfig(format="%(message)s", level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)])
+
+    if args.command == "to-text":
+        output = args.output or os.path.splitext(args.container)[0] + ".txt"
+        from .container import to_plain_text
+        to_plain_text(args.container, output)
+        print(f"Wrote {output}.")
+        return
 
     # Determine whether we're using the global config
     global_config = args.global_config if hasattr(args, 'global_config') else False
     permanent = args.permanent if hasattr(args, 'permanent') else False
 
-    # Initialize the collector
-    collector = FileCollector(root_dir=".", use_global_config=global_config, permanent=permanent)
+    options = dict(use_global_config=global_config, jobs=args.jobs, incremental=args.incremental, full=args.full,
+                   max_tokens=args.max_tokens, skip_generated=args.skip_generated, source=args.source,
+                   shard_size=args.shard_size, output_format=args.output_format, dedup=args.dedup,
+                   compact=args.compact, tree_depth=args.tree_depth, tree_max_entries=args.tree_max_entries,
+                   detailed_stats=args.stats or args.stats_json is not None)
+
+    if args.command == "batch":
+        from .batch import combined_stats, read_roots, report, run_batch
+        roots = list(args.roots)
+        if args.roots_file:
+            roots.extend(read_roots(args.roots_file))
+        if not roots:
+            parser.error("batch needs at least one root directory (or --from FILE).")
+        workers = max(1, min(len(roots), args.workers or os.cpu_count() or 1))
+        start = time.perf_counter()
+        results = run_batch(roots, lambda root: FileCollector(root_dir=root, **options), workers)
+        print(report(results, start, workers), file=sys.stderr)
+        if args.stats_json:
+            combined_stats(results, start).write_json(args.stats_json)
+        if any(error is not None for _, _, _, error in results):
+            sys.exit(1)
+        return
+
+    if not os.path.isdir(args.root):
+        from .archive import is_archive
+        if not os.path.exists(args.root):
+            parser.error(f"--root {args.root} does not exist.")
+        if not is_archive(args.root):
+            parser.error(f"--root {args.root} is neither a directory nor a readable zip or tar archive.")
 
-    if args.command in ["include", "exclude", "remove-include", "remove-exclude"]:
+    # Initialize the collector
+    collector = FileCollector(root_dir=args.root, permanent=permanent, **options)
+
+    if args.command == "watch":
+        if args.shard_size is not None or args.output_format != "text":
+            parser.error("watch only maintains the plain-text output, drop --shard-size and --format.")
+        if os.path.isfile(args.root):
+            parser.error("watch needs a directory root, archives are read once and not watched.")
+        from .watch import watch
+        watch(collector, debounce=args.debounce, polling=args.poll, interval=args.poll_interval)
+        return
+
+    if args.command in EDIT_COMMANDS:
         if args.command == "include":
             collector.add_include(args.pattern, permanent=permanent)
         elif args.command == "exclude":
@@ -284,8 +1171,30 @@ def main():
         # If no command is provided, just run the collector
         pass
 
-    collector.run()
+    # A temporary edit only exists for the run that follows it; listing and permanent edits don't walk the
+    # directory unless --run is given.
+    if args.command is None or args.run or (args.command in EDIT_COMMANDS and not permanent):
+        if args.stdout:
+            if args.incremental or args.shard_size is not None or args.output_format != "text":
+                parser.error("--stdout writes plain text, it cannot be combined with --incremental, --shard-size or --format.")
+            try:
+                collector.write_to(sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+            except BrokenPipeError:
+                # The reader (e.g. head) is gone. Point stdout at devnull so flushing it at exit fails no more.
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                collector.close()
+                sys.exit(1)
+        elif args.profile:
+            collector.profile()
+        else:
+            collector.run()
+    if args.stats:
+        print(collector.stats.report(), file=sys.stderr)
+    if args.stats_json:
+        collector.stats.write_json(args.stats_json)
     collector.reload_settings_from_permanent_config()
+    collector.close()
 
     
 if __name__ == "__main__":
@@ -325,7 +1234,7 @@ Dann die include "file.py" operation auf der globalen configdatei durchführen,
 und für alle zukünftigen runs included ist, welche die globale config nutzen müssen.
 
 
-Einen run starten mit determinierter config.
+Bei --permanent wird nur die config geändert; ein run startet nur mit --run (dann mit der geänderten config).
 
 
 Globale config wird nur ausgelesen fall "--global-config" als parameter, dann egal ob lokale existiert
@@ -356,13 +1265,13 @@ To implement the desired behavior for the **CLI tool** with local and global con
     - **Local config is used** if it exists.
     - **If local config does not exist**, the global config is copied to a new local `.gptignore` file.
     - Modify the local config to include `file.py` permanently.
-    - Start a run with the modified local config.
+    - No run is started unless `--run` is given, which runs with the modified local config.
 
 4. **Permanent Include Globally (`2gpt include "file.py" --permanent --global-config`)**:
     - **Local config is ignored**.
     - **Global config is used**.
     - Modify the global config to include `file.py` permanently.
-    - Start a run with the modified global config.
+    - No run is started unless `--run` is given, which runs with the modified global config.
 
 ---
 
@@ -378,18 +1287,18 @@ To implement the desired behavior for the **CLI tool** with local and global con
     - **Local config is used** if it exists.
     - **If local config does not exist**, the global config is copied to a new local `.gptignore` file.
     - Modify the local config to exclude `file.py` permanently.
-    - Start a run with the modified local config.
+    - No run is started unless `--run` is given, which runs with the modified local config.
 
 3. **Permanent Exclude Globally (`2gpt exclude "file.py" --permanent --global-config`)**:
     - **Local config is ignored**.
     - **Global config is used**.
     - Modify the global config to exclude `file.py` permanently.
-    - Start a run with the modified global config.
+    - No run is started unless `--run` is given, which runs with the modified global config.
 
 4. **List Includes (`2gpt list-includes`)**:
     - **Local config is used** if it exists.
     - **If local config does not exist**, the global config is used.
-    - List all files or patterns that are included in the config.
+    - List all files or patterns that are included in the config (no run is started unless `--run` is given).
 
 5. **List Includes Globally (`2gpt list-includes --global-config`)**:
     - **Local config is ignored**.
@@ -399,7 +1308,7 @@ To implement the desired behavior for the **CLI tool** with local and global con
 6. **List Excludes (`2gpt list-excludes`)**:
     - **Local config is used** if it exists.
     - **If local config does not exist**, the global config is used.
-    - List all files or patterns that are excluded in the config.
+    - List all files or patterns that are excluded in the config (no run is started unless `--run` is given).
 
 7. **List Excludes Globally (`2gpt list-excludes --global-config`)**:
     - **Local config is ignored**.
@@ -411,12 +1320,12 @@ To implement the desired behavior for the **CLI tool** with local and global con
     - **If local config does not exist**, the global config is used.
     - Remove the specified file or pattern (`file.py`) from the inclusion/exclusion list.
     - If the file is removed temporarily, the config remains unchanged.
-    - **If `--permanent` is specified**, the change is applied permanently to the local config.
+    - **If `--permanent` is specified**, the change is applied permanently to the local config and no run is started unless `--run` is given.
 
 9. **Remove Include/Exclude Globally (`2gpt remove-include "file.py" --permanent --global-config` or `2gpt remove-exclude "file.py" --permanent --global-config`)**:
     - **Local config is ignored**.
     - **Global config is used**.
-    - Remove the specified file or pattern (`file.py`) from the inclusion/exclusion list in the global config permanently.
+    - Remove the specified file or pattern (`file.py`) from the inclusion/exclusion list in the global config permanently (no run unless `--run` is given).
 
 ---
 
@@ -0,0 +1,44 @@
+import hashlib
+
+from .content import CHUNK_SIZE
+from .pipeline import ordered_map
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE, open_file=None):
+    """Return the blake2b digest of a file's raw content, or None if it cannot be read."""
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        with (open_file(path) if open_file is not None else open(path, 'rb')) as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                hasher.update(data)
+    except OSError:
+        return None
+    return hasher.digest()
+
+
+def find_duplicates(files, jobs=1, open_file=None):
+    """
+    Return {path: path of the first file with the same content} for the FileEntry list files (in output order).
+    Files are opened with open_file(path) if given.
+
+    Only files sharing their size with another file are hashed, so unique sizes, the common case, cost nothing.
+    Empty and unreadable files are never duplicates.
+    """
+    sizes = {}
+    for entry in files:
+        if entry.size:
+            sizes[entry.size] = sizes.get(entry.size, 0) + 1
+    candidates = [entry for entry in files if sizes.get(entry.size, 0) > 1]
+
+    duplicates = {}
+    first = {}  # (size, digest) -> path
+    for entry, digest in zip(candidates, ordered_map(lambda entry: file_digest(entry.path, open_file=open_file), candidates, jobs)):
+        if digest is None:
+            continue
+        original = first.setdefault((entry.size, digest), entry.path)
+        if original != entry.path:
+            duplicates[entry.path] = original
+    return duplicates
@@ -0,0 +1,152 @@
+import os
+import struct
+
+# Mode bits of index entries that are not regular files in the working tree.
+_MODE_TYPE_MASK = 0o170000
+_MODE_GITLINK = 0o160000  # submodule
+_MODE_DIRECTORY = 0o040000  # sparse index directory entry
+
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_FLAG_NAME_MASK = 0x0FFF
+_EXTENDED_SKIP_WORKTREE = 0x4000
+
+# ctime, mtime (seconds + nanoseconds each), dev, ino, mode, uid, gid, size
+_STAT_FORMAT = struct.Struct(">10I")
+
+
+class GitIndexError(Exception):
+    """The git index could not be found or parsed."""
+
+
+def find_repository(path):
+    """
+    Return (worktree, git_dir) of the repository containing path, or None.
+    Follows `.git` files ("gitdir: ...") as used by worktrees and submodules.
+    """
+    path = os.path.abspath(path)
+    while True:
+        dotgit = os.path.join(path, ".git")
+        if os.path.isdir(dotgit):
+            return path, dotgit
+        if os.path.isfile(dotgit):
+            try:
+                with open(dotgit, 'r', encoding='utf-8') as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                git_dir = line[len("gitdir:"):].strip()
+                return path, os.path.normpath(os.path.join(path, git_dir))
+            return None
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _hash_size(git_dir):
+    """SHA-1 repositories store 20 byte object ids, SHA-256 ones 32."""
+    config_paths = [os.path.join(git_dir, "config")]
+    commondir = os.path.join(git_dir, "commondir")
+    if os.path.isfile(commondir):
+        with open(commondir, 'r', encoding='utf-8') as f:
+            config_paths.append(os.path.join(git_dir, f.read().strip(), "config"))
+    for config_path in config_paths:
+        try:
+            with open(config_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    key, _, value = line.partition("=")
+                    if key.strip().lower() == "objectformat" and value.strip().lower() == "sha256":
+                        return 32
+        except OSError:
+            continue
+    return 20
+
+
+def read_index_paths(git_dir):
+    """
+    Return the '/'-separated paths of the files tracked in git_dir/index, in index order.
+
+    Parses index versions 2 to 4 directly (no git executable needed). Submodules, sparse
+    directory entries and skip-worktree entries are left out; a file with a merge conflict
+    (entries for stages 1 to 3 instead of stage 0) is listed once.
+    """
+    index_path = os.path.join(git_dir, "index")
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise GitIndexError(f"cannot read {index_path}: {e}") from e
+    if len(data) < 12 or data[:4] != b"DIRC":
+        raise GitIndexError(f"{index_path} is not a git index")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported git index version {version}")
+
+    hash_size = _hash_size(git_dir)
+    fixed_size = _STAT_FORMAT.size + hash_size + 2
+    paths = []
+    previous = b""
+    unmerged = None  # name of the last conflicted entry listed
+    offset = 12
+    try:
+        for _ in range(count):
+            start = offset
+            mode = _STAT_FORMAT.unpack_from(data, offset)[6]
+            (flags,) = struct.unpack_from(">H", data, offset + fixed_size - 2)
+            offset += fixed_size
+            extended = 0
+            if flags & _FLAG_EXTENDED and version >= 3:
+                (extended,) = struct.unpack_from(">H", data, offset)
+                offset += 2
+            if version == 4:
+                # The name is the previous name minus N trailing bytes plus a NUL terminated suffix.
+                strip = data[offset] & 0x7F
+                while data[offset] & 0x80:
+                    offset += 1
+                    strip = ((strip + 1) << 7) | (data[offset] & 0x7F)
+                offset += 1
+                end = data.index(b"\0", offset)
+                name = previous[:len(previous) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                name_length = flags & _FLAG_NAME_MASK
+                if name_length == _FLAG_NAME_MASK:
+                    end = data.index(b"\0", offset)
+                else:
+                    end = offset + name_length
+                name = data[offset:end]
+                # Entries are padded with 1 to 8 NUL bytes to a multiple of 8.
+                offset = start + ((end - start) // 8 + 1) * 8
+            previous = name
+
+            mode_type = mode & _MODE_TYPE_MASK
+            if extended & _EXTENDED_SKIP_WORKTREE or mode_type in (_MODE_GITLINK, _MODE_DIRECTORY):
+                continue
+            if flags & _FLAG_STAGE_MASK:
+                # The stages of a conflicted file are adjacent; the working tree has one file for all of them.
+                if name == unmerged:
+                    continue
+                unmerged = name
+            paths.append(os.fsdecode(name))
+    except (struct.error, IndexError, ValueError) as e:
+        raise GitIndexError(f"{index_path} is truncated or corrupt") from e
+    return paths
+
+
+def tracked_files(root_dir):
+    """
+    Return the tracked files below root_dir as '/'-separated paths relative to root_dir,
+    or None if root_dir is not inside a git repository.
+    """
+    repository = find_repository(root_dir)
+    if repository is None:
+        return None
+    worktree, git_dir = repository
+    prefix = os.path.relpath(os.path.abspath(root_dir), worktree).replace(os.sep, "/")
+    paths = read_index_paths(git_dir)
+    if prefix == ".":
+        return paths
+    prefix += "/"
+    return [path[len(prefix):] for path in paths if path.startswith(prefix)]
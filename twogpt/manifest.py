@@ -0,0 +1,92 @@
+import json
+import os
+from collections import namedtuple
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+# One collected file: its stat data and content hash when it was read, where
+# its block (possibly empty) sits in the output file, and the path its block
+# refers to if it was deduplicated.
+ManifestEntry = namedtuple("ManifestEntry", ["path", "size", "mtime_ns", "hash", "offset", "length", "duplicate_of"],
+                           defaults=[None])
+
+
+def manifest_path(output_file):
+    """Return the path of the manifest kept next to output_file."""
+    return output_file + MANIFEST_SUFFIX
+
+
+class Manifest:
+    """
+    Record of the blocks in a previously written output file, used to copy unchanged
+    blocks instead of re-reading their files.
+    """
+
+    def __init__(self, entries, started_ns, options, inspected=None):
+        self.entries = {entry.path: entry for entry in entries}
+        # path -> (size, mtime_ns, sniffed kind, estimated tokens or None) of every file whose head was read,
+        # including the ones left out as binary or generated.
+        self.inspected = inspected or {}
+        # Files modified after the previous run started may have changed without a
+        # visible mtime difference ("racily clean"), so they are never reused.
+        self.started_ns = started_ns
+        self.options = options
+
+    def reusable(self, entry, duplicate_of=None):
+        """
+        Return the ManifestEntry for a scanned FileEntry if its block can be copied, else None.
+        duplicate_of is the path the block should now refer to (None for a block with the content).
+        """
+        record = self.entries.get(entry.path)
+        if (record is None or record.size != entry.size or record.mtime_ns != entry.mtime_ns
+                or record.mtime_ns >= self.started_ns or record.duplicate_of != duplicate_of):
+            return None
+        return record
+
+    def inspection(self, entry):
+        """Return the (kind, tokens) recorded for a scanned FileEntry if it is unchanged, else None."""
+        known = self.inspected.get(entry.path)
+        if (known is None or known[0] != entry.size or known[1] != entry.mtime_ns
+                or known[1] >= self.started_ns):
+            return None
+        return known[2], known[3]
+
+    @classmethod
+    def load(cls, output_file, options):
+        """
+        Load the manifest of output_file. Returns None if there is none, it is unreadable,
+        was written with different options, or the output file changed since it was written.
+        """
+        try:
+            with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            st = os.stat(output_file)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != MANIFEST_VERSION or data.get("options") != options
+                or data.get("output_size") != st.st_size or data.get("output_mtime_ns") != st.st_mtime_ns):
+            return None
+        try:
+            entries = [ManifestEntry(**entry) for entry in data["entries"]]
+            inspected = {path: tuple(values) for path, values in data.get("inspected", {}).items()}
+        except (KeyError, TypeError, AttributeError):
+            return None
+        return cls(entries, data["started_ns"], options, inspected)
+
+    def save(self, output_file):
+        """Write the manifest next to output_file, recording the output's current size and mtime."""
+        st = os.stat(output_file)
+        data = {
+            "version": MANIFEST_VERSION,
+            "options": self.options,
+            "started_ns": self.started_ns,
+            "output_size": st.st_size,
+            "output_mtime_ns": st.st_mtime_ns,
+            "entries": [entry._asdict() for entry in self.entries.values()],
+            "inspected": self.inspected,
+        }
+        path = manifest_path(output_file)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
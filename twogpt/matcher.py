@@ -0,0 +1,191 @@
+import fnmatch
+import os
+import re
+
+GLOB_CHARS = frozenset("*?[")
+
+
+def _is_literal(pattern):
+    return not GLOB_CHARS.intersection(pattern)
+
+
+class PatternMatcher:
+    """
+    Match file names against a set of fnmatch-style patterns, compiled once.
+
+    Answers are the same as `any(re.match(fnmatch.translate(p), name) for p in patterns)`,
+    but patterns are split by shape so most names never reach the regex engine:
+    literal names like `Dockerfile` go into a set, `*.ext`-style patterns into a
+    suffix index keyed by suffix length, and only the remaining globs are joined
+    into one compiled alternation.
+    """
+
+    def __init__(self, patterns, normcase=False):
+        self.patterns = tuple(sorted(set(patterns)))
+        # fnmatch.fnmatch() normalizes case (a no-op on POSIX); the regex based
+        # file checks do not. normcase lets callers pick the behaviour they replace.
+        self.normcase = normcase and os.path.normcase("A") != "A"
+        self.literals = set()
+        self.suffixes = {}  # suffix length -> set of suffixes
+        globs = []
+        for pattern in self.patterns:
+            if self.normcase:
+                pattern = os.path.normcase(pattern)
+            if _is_literal(pattern):
+                self.literals.add(pattern)
+            elif pattern[0] == "*" and _is_literal(pattern[1:]):
+                suffix = pattern[1:]
+                if not suffix:
+                    # A bare "*" matches every name.
+                    globs.append(pattern)
+                else:
+                    self.suffixes.setdefault(len(suffix), set()).add(suffix)
+            else:
+                globs.append(pattern)
+        self.suffix_lengths = sorted(self.suffixes)
+        self.regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in globs)) if globs else None
+
+    def match(self, name):
+        """Return True if name matches any of the patterns."""
+        if self.normcase:
+            name = os.path.normcase(name)
+        if name in self.literals:
+            return True
+        suffixes = self.suffixes
+        for length in self.suffix_lengths:
+            if name[-length:] in suffixes[length]:
+                return True
+        return self.regex is not None and self.regex.match(name) is not None
+
+    def __repr__(self):
+        return f"PatternMatcher({list(self.patterns)!r})"
+
+
+def is_path_pattern(pattern):
+    """Return True for gitignore-style patterns that need the relative path: negations and patterns with a '/'."""
+    return pattern.startswith("!") or "/" in pattern
+
+
+def _glob_to_regex(glob):
+    """Translate a gitignore glob to a regex over '/'-separated paths ('*' stops at '/', '**' does not)."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end + 1
+                continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class PathRule:
+    """
+    One gitignore-style exclude pattern, matched against paths relative to the root.
+
+    A leading '!' re-includes what earlier patterns excluded, a trailing '/' only matches directories,
+    a '/' at the start or in the middle anchors the pattern at the root (otherwise it matches at any depth),
+    and '**' matches across directory levels.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.negate = pattern.startswith("!")
+        body = pattern[1:] if self.negate else pattern
+        self.dir_only = body.endswith("/")
+        body = body.rstrip("/")
+        anchored = "/" in body
+        body = body.lstrip("/")
+        regex = _glob_to_regex(body)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self.regex = re.compile(regex + r"\Z", re.S)
+
+    def matches(self, relpath, is_dir):
+        return (is_dir or not self.dir_only) and self.regex.match(relpath) is not None
+
+    def __repr__(self):
+        return f"PathRule({self.pattern!r})"
+
+
+class RuleSet:
+    """
+    Include/exclude rules of one run, compiled once and shared by everything that filters paths.
+
+    Bare exclude names and globs match the entry name at any depth, as they always have. Patterns with a '/'
+    or a leading '!' follow gitignore rules (see PathRule). Without negations, an entry is excluded if any
+    pattern matches; once a negation is present, the last matching pattern in exclude_patterns order wins.
+    """
+
+    def __init__(self, include_patterns, exclude_patterns):
+        exclude_patterns = list(dict.fromkeys(exclude_patterns))
+        self.include_patterns = frozenset(include_patterns)
+        self.exclude_patterns = frozenset(exclude_patterns)
+        name_patterns = [p for p in exclude_patterns if not is_path_pattern(p)]
+        self.include = PatternMatcher(self.include_patterns)
+        self.exclude = PatternMatcher(name_patterns)
+        # Directory pruning used fnmatch.fnmatch, which normalizes case on Windows.
+        self.exclude_dir = PatternMatcher(name_patterns, normcase=True)
+        self.path_rules = [PathRule(p) for p in exclude_patterns if is_path_pattern(p)]
+        # With negations the order matters, so every pattern is evaluated as a PathRule.
+        self.ordered_rules = None
+        if any(rule.negate for rule in self.path_rules):
+            self.ordered_rules = [PathRule(p) for p in reversed(exclude_patterns)]
+
+    def _last_match(self, relpath, is_dir):
+        for rule in self.ordered_rules:
+            if rule.matches(relpath, is_dir):
+                return not rule.negate
+        return False
+
+    def excludes_file(self, name, relpath=None):
+        """Return True if a file with this name (and relative path) is hidden from the tree and the collection."""
+        relpath = name if relpath is None else relpath
+        if self.ordered_rules is not None:
+            return self._last_match(relpath, False)
+        return self.exclude.match(name) or any(rule.matches(relpath, False) for rule in self.path_rules)
+
+    def excludes_dir(self, name, relpath=None):
+        """Return True if a directory with this name (and relative path) is pruned from the walk."""
+        relpath = name if relpath is None else relpath
+        if self.ordered_rules is not None:
+            return self._last_match(relpath, True)
+        return (name in self.exclude_patterns or self.exclude_dir.match(name)
+                or any(rule.matches(relpath, True) for rule in self.path_rules))
+
+    def excludes_contents(self, relpath):
+        """
+        Return True if everything inside the directory relpath is excluded (e.g. by 'build/**'),
+        so the walker can skip listing it. Always False once negations are present.
+        """
+        if self.ordered_rules is not None:
+            return False
+        # No file name contains NUL, so only rules matching any child name can match the probe.
+        probe = relpath + "/\0"
+        return any(rule.matches(probe, False) for rule in self.path_rules)
+
+    def includes_file(self, name, relpath=None):
+        """Return True if a file with this name (and relative path) should be collected."""
+        return self.include.match(name) and not self.excludes_file(name, relpath)
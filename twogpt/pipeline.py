@@ -0,0 +1,32 @@
+from collections import deque
+
+
+def ordered_map(func, items, jobs=1, depth=None):
+    """
+    Yield func(item) for every item, in input order.
+
+    With jobs > 1 the calls run on a thread pool, at most `depth` results
+    (default: 4 per worker) are in flight or waiting to be consumed, so memory
+    stays bounded no matter how many items there are.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    depth = depth or jobs * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        try:
+            for item in items:
+                if len(pending) >= depth:
+                    yield pending.popleft().result()
+                pending.append(pool.submit(func, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The consumer may stop early; don't start work nobody will read.
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+
+CONTAINER_SUFFIX = ".2gpt"
+SIZE_UNITS = {"": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+TOKEN_UNITS = {"": 1, "k": 1000, "m": 1000 ** 2}
+TOKEN_SUFFIXES = ("t", "tok", "tokens")
+
+
+def parse_shard_size(text):
+    """
+    Parse a --shard-size value into (limit, unit): "500000" or "10MB" are bytes,
+    "100000t" or "100k tokens" are estimated tokens.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*([a-zA-Z]*)\s*", text)
+    if not match:
+        raise ValueError(f"invalid shard size {text!r}")
+    number, suffix, tokens = match.groups()
+    suffix, tokens = suffix.lower(), tokens.lower()
+    unit = "bytes"
+    if suffix in TOKEN_SUFFIXES and not tokens:
+        suffix, unit = "", "tokens"
+    elif tokens in TOKEN_SUFFIXES:
+        unit = "tokens"
+    elif tokens:
+        raise ValueError(f"invalid shard size {text!r}")
+    units = TOKEN_UNITS if unit == "tokens" else SIZE_UNITS
+    if suffix not in units:
+        raise ValueError(f"invalid shard size unit {suffix!r}")
+    limit = int(float(number) * units[suffix])
+    if limit <= 0:
+        raise ValueError("shard size must be positive")
+    return limit, unit
+
+
+def shard_name(output_file, number):
+    """allfiles.txt -> allfiles.001.txt"""
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}.{number:03d}{ext}"
+
+
+def shard_patterns(output_file):
+    """Exclude patterns matching the shards and the shard index of output_file."""
+    stem, ext = os.path.splitext(os.path.basename(output_file))
+    return [f"{stem}.[0-9]*{ext}", os.path.basename(index_name(output_file))]
+
+
+def index_name(output_file):
+    """allfiles.txt -> allfiles.index.json"""
+    return os.path.splitext(output_file)[0] + ".index.json"
+
+
+def container_path(output_file):
+    """allfiles.txt -> allfiles.2gpt (the indexed container of --format indexed, see container.py)"""
+    return os.path.splitext(output_file)[0] + CONTAINER_SUFFIX
+
+
+def plan_shards(files, estimates, limit, first_size=0):
+    """
+    Assign files to shards without splitting blocks.
+
+    estimates maps each file's path to the estimated size of its block (same unit as limit);
+    first_size is taken by the tree section at the start of the first shard (a tree that leaves no room
+    for the first file gets the first group to itself). Returns a list of
+    (files, oversized) groups: a file that does not fit in a shard by itself gets a group of its
+    own, flagged oversized, which is split across as many shards as needed.
+    """
+    groups = []
+    current, used = [], first_size
+    for entry in files:
+        size = estimates[entry.path]
+        if size > limit:
+            if current or not groups:
+                groups.append((current, False))
+            groups.append(([entry], True))
+            current, used = [], 0
+            continue
+        if (current or used) and used + size > limit:
+            groups.append((current, False))
+            current, used = [], 0
+        current.append(entry)
+        used += size
+    if current or not groups:
+        groups.append((current, False))
+    return groups
+
+
+def _split_point(data, limit):
+    """Index <= limit to split data at: after the last newline if there is one, else on a UTF-8 character boundary."""
+    newline = data.rfind(b"\n", 0, limit)
+    if newline != -1:
+        return newline + 1
+    cut = limit
+    while cut > 0 and data[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return cut or limit
+
+
+class RollingWriter:
+    """
+    A binary file-like object spreading writes over files created by open_part(),
+    starting a new one whenever limit bytes are reached (limit None: never).
+    """
+
+    def __init__(self, open_part, limit=None):
+        self.open_part = open_part
+        self.limit = limit
+        self.parts = []
+        self.offset = 0
+        self._file = None
+        self._size = 0
+
+    def _next(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = self.open_part(len(self.parts))
+        self.parts.append(self._file.name)
+        self._size = 0
+
+    def write(self, data):
+        if self._file is None:
+            self._next()
+        self.offset += len(data)
+        while data:
+            if self.limit is None or self._size + len(data) <= self.limit:
+                self._file.write(data)
+                self._size += len(data)
+                return
+            room = self.limit - self._size
+            if room <= 0:
+                self._next()
+                continue
+            cut = _split_point(data, room)
+            self._file.write(data[:cut])
+            self._size += cut
+            data = data[cut:]
+            self._next()
+
+    def tell(self):
+        return self.offset
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_index(output_file, shards, files):
+    """Write the shard index: the shard names in order and, per file, the shard(s) holding its block."""
+    with open(index_name(output_file), 'w', encoding='utf-8') as f:
+        json.dump({"shards": shards, "files": files}, f, indent=4)
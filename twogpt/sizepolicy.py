@@ -0,0 +1,78 @@
+"""
+Size policies for large files, configured in .gptignore and decided from the size the walk already stat'ed:
+
+    "size_policies": [
+        {"pattern": "*.log", "max_size": "1MB", "action": "skip"},
+        {"pattern": "*.sql", "max_size": "256KB", "action": "head", "head": "64KB"},
+        {"pattern": "*.txt", "max_size": "1MB", "action": "head_tail", "head": "32KB", "tail": "32KB"}
+    ]
+
+The first policy whose pattern matches the file name and whose max_size the file exceeds applies. "skip" drops
+the file, "head" keeps its first head bytes and "head_tail" its first head and last tail bytes, with a marker
+saying how many bytes were left out. Only the kept bytes are read.
+"""
+import re
+from collections import namedtuple
+
+from .matcher import PatternMatcher
+from .shards import SIZE_UNITS
+
+SKIP = "skip"
+HEAD = "head"
+HEAD_TAIL = "head_tail"
+ACTIONS = (SKIP, HEAD, HEAD_TAIL)
+
+SizePolicy = namedtuple("SizePolicy", ["pattern", "max_size", "action", "head", "tail"])
+
+
+def parse_size(value):
+    """Parse a byte size given as a number or a string like "64KB" or "1.5 MB"."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        size = value
+    else:
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", str(value))
+        if not match or match.group(2).lower() not in SIZE_UNITS:
+            raise ValueError(f"invalid size {value!r}")
+        size = int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+    if size < 0:
+        raise ValueError(f"invalid size {value!r}")
+    return size
+
+
+def elision_marker(omitted):
+    """The line that replaces the bytes a policy left out."""
+    return f"\n[... {omitted:,} bytes omitted ...]\n".encode('utf-8')
+
+
+class SizePolicies:
+    """The "size_policies" section of the config."""
+
+    def __init__(self, rules):
+        self.policies = []
+        for rule in rules:
+            action = rule.get("action", SKIP)
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown size policy action {action!r}, expected one of {', '.join(ACTIONS)}")
+            if "pattern" not in rule or "max_size" not in rule:
+                raise ValueError(f"Size policy {rule!r} needs a pattern and a max_size")
+            max_size = parse_size(rule["max_size"])
+            head = parse_size(rule.get("head", max_size)) if action != SKIP else 0
+            tail = parse_size(rule.get("tail", head)) if action == HEAD_TAIL else 0
+            policy = SizePolicy(rule["pattern"], max_size, action, head, tail)
+            self.policies.append((PatternMatcher([rule["pattern"]]), policy))
+
+    def decide(self, name, size):
+        """Return the SizePolicy that applies to a file of this name and size, or None to include it completely."""
+        for matcher, policy in self.policies:
+            if size > policy.max_size and matcher.match(name):
+                if policy.action != SKIP and policy.head + policy.tail >= size:
+                    return None
+                return policy
+        return None
+
+
+def emitted_ranges(policy, size):
+    """Return the (offset, length) ranges of a file of size bytes that a head or head_tail policy keeps."""
+    if policy.action == HEAD:
+        return [(0, policy.head)]
+    return [(0, policy.head), (size - policy.tail, policy.tail)]
@@ -0,0 +1,59 @@
+# Bytes read from the head of a file to decide whether it is worth collecting.
+SNIFF_SIZE = 8192
+
+# A sample with more than this share of non-text bytes is treated as binary.
+BINARY_RATIO = 0.3
+# Average line length above which a file is considered minified.
+MINIFIED_LINE_LENGTH = 500
+GENERATED_MARKERS = (
+    b"@generated",
+    b"DO NOT EDIT",
+    b"Code generated by",
+    b"AUTOGENERATED",
+    b"AUTO-GENERATED",
+    b"auto-generated",
+    b"This file is automatically generated",
+)
+# Generated-file markers only count near the top of the file.
+GENERATED_HEADER_SIZE = 1024
+
+BINARY = "binary"
+MINIFIED = "minified"
+GENERATED = "generated"
+
+_TEXT_CONTROL = b"\t\n\r\f\b\x1b"
+_CONTROL = bytes(b for b in list(range(32)) + [127] if b not in _TEXT_CONTROL)
+_HIGH = bytes(range(128, 256))
+
+
+def _is_utf8(sample):
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # The sample may end in the middle of a character.
+        return e.reason == 'unexpected end of data' and e.start >= len(sample) - 3
+    return True
+
+
+def sniff(sample):
+    """
+    Classify the first bytes of a file: BINARY, MINIFIED, GENERATED, or None for ordinary text.
+
+    NUL bytes or a high share of control characters (and of non-ASCII bytes, unless the sample is valid UTF-8)
+    mean binary; a very long average line means minified; a known marker in the header means generated.
+    """
+    if not sample:
+        return None
+    if b"\0" in sample:
+        return BINARY
+    non_text = len(sample) - len(sample.translate(None, _CONTROL))
+    if not _is_utf8(sample):
+        non_text += len(sample) - len(sample.translate(None, _HIGH))
+    if non_text > len(sample) * BINARY_RATIO:
+        return BINARY
+    if len(sample) / (sample.count(b"\n") + 1) > MINIFIED_LINE_LENGTH:
+        return MINIFIED
+    header = sample[:GENERATED_HEADER_SIZE]
+    if any(marker in header for marker in GENERATED_MARKERS):
+        return GENERATED
+    return None
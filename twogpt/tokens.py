@@ -0,0 +1,102 @@
+# Bytes read from the head of each file to classify its characters.
+SAMPLE_SIZE = 4096
+
+_ALNUM = bytes(range(48, 58)) + bytes(range(65, 91)) + bytes(range(97, 123)) + b"_"
+_SPACE = b" \t\r\n\x0b\x0c"
+_ASCII = bytes(range(128))
+_PUNCT = bytes(b for b in _ASCII if b not in _ALNUM and b not in _SPACE)
+
+# Rough tokens per byte for each character class, tuned for BPE tokenizers of the
+# GPT family: words are ~4 characters per token, punctuation mostly tokenizes on
+# its own, whitespace is largely folded into the following token and multi-byte
+# UTF-8 text costs about one token per two bytes.
+_ALNUM_COST = 0.25
+_PUNCT_COST = 0.7
+_SPACE_COST = 0.1
+_OTHER_COST = 0.5
+
+
+def estimate_text_tokens(data):
+    """Estimate the token count of a bytes object from its character classes (no tokenizer involved)."""
+    if not data:
+        return 0.0
+    # bytes.translate(None, delete) runs in C, so counting a class costs one pass per class.
+    total = len(data)
+    alnum = total - len(data.translate(None, _ALNUM))
+    space = total - len(data.translate(None, _SPACE))
+    punct = total - len(data.translate(None, _PUNCT))
+    other = total - alnum - space - punct
+    return alnum * _ALNUM_COST + punct * _PUNCT_COST + space * _SPACE_COST + other * _OTHER_COST
+
+
+def estimate_file_tokens(path, size, sample=None, open_file=None):
+    """
+    Estimate the tokens of a file's output block from its size and the character classes of its first bytes.
+    The sample is read from path (with open_file(path) if given) unless passed in.
+    """
+    if sample is None:
+        try:
+            with (open_file(path) if open_file is not None else open(path, 'rb')) as f:
+                sample = f.read(SAMPLE_SIZE)
+        except OSError:
+            return 0
+    if not sample:
+        return 0
+    per_byte = estimate_text_tokens(sample) / len(sample)
+    return int(size * per_byte) + block_overhead_tokens(path)
+
+
+def block_overhead_tokens(path):
+    """Tokens spent on the START/END markers around a block."""
+    return int(2 * (estimate_text_tokens(path.encode('utf-8')) + 10))
+
+
+class Prioritizer:
+    """
+    Order files for packing into a token budget.
+
+    order is "pattern" (files matching earlier entries of patterns first, then the rest)
+    or "recency" (most recently modified first, patterns still take precedence).
+    Ties keep the scan order. Patterns match the file name or the path relative to the root.
+    """
+
+    ORDERS = ("pattern", "recency")
+
+    def __init__(self, patterns=(), order="pattern"):
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown priority order {order!r}, expected one of {', '.join(self.ORDERS)}.")
+        import fnmatch
+        self.patterns = list(patterns)
+        self.order = order
+        self._fnmatchcase = fnmatch.fnmatchcase
+
+    def rank(self, entry):
+        name = entry.relpath.rsplit("/", 1)[-1]
+        for index, pattern in enumerate(self.patterns):
+            if self._fnmatchcase(name, pattern) or self._fnmatchcase(entry.relpath, pattern):
+                return index
+        return len(self.patterns)
+
+    def sort(self, entries):
+        if self.order == "recency":
+            return sorted(entries, key=lambda entry: (self.rank(entry), -entry.mtime_ns))
+        return sorted(entries, key=self.rank)
+
+
+def pack(entries, estimates, budget, prioritizer):
+    """
+    Select files to fit the token budget, in priority order, skipping any file that no longer fits.
+    estimates maps each entry's path to its estimated tokens.
+    Returns (kept, dropped): kept in the original order, dropped in priority order.
+    """
+    kept_paths = set()
+    dropped = []
+    used = 0
+    for entry in prioritizer.sort(entries):
+        tokens = estimates[entry.path]
+        if used + tokens <= budget:
+            kept_paths.add(entry.path)
+            used += tokens
+        else:
+            dropped.append(entry)
+    return [entry for entry in entries if entry.path in kept_paths], dropped
@@ -0,0 +1,291 @@
+import os
+from collections import namedtuple
+
+# A file selected for content collection. `path` is what ends up in the
+# START/END markers (root_dir joined with the relative path, like os.walk),
+# `relpath` is the '/'-separated path relative to root_dir.
+FileEntry = namedtuple("FileEntry", ["path", "relpath", "size", "mtime_ns"])
+
+# Result of a single traversal: the rendered File Structure section (a
+# TreeSection) and the ordered list of files to collect.
+ScanResult = namedtuple("ScanResult", ["tree", "files"])
+
+BRANCH = "├── "
+LAST_BRANCH = "└── "
+PIPE = "│   "
+SPACE = "    "
+
+# The tree section is kept in memory up to this size and spooled to a temporary file beyond it.
+SPOOL_SIZE = 1024 * 1024
+SIZE_LABELS = ("bytes", "KB", "MB", "GB", "TB")
+
+
+class TreeSection:
+    """
+    The "File Structure:" section of the output, written line by line while the walk renders it. Huge trees
+    are spooled to a temporary file instead of being held as a list of lines.
+    """
+
+    def __init__(self):
+        import tempfile  # Not needed by commands that do not walk, see core.py.
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self._file.write(b"File Structure:\n")
+        self.lines = 0
+        self.size = None
+
+    def add(self, line):
+        self._file.write(line.encode('utf-8') + b"\n")
+        self.lines += 1
+
+    def finish(self):
+        self._file.write(b"\n")
+        self.size = self._file.tell()
+
+    def chunks(self, chunk_size=SPOOL_SIZE):
+        """Iterate over the section's UTF-8 bytes."""
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def write_to(self, f):
+        """Copy the section to the binary file object f."""
+        for chunk in self.chunks():
+            f.write(chunk)
+
+    def getvalue(self):
+        self._file.seek(0)
+        return self._file.read()
+
+
+def format_size(size):
+    """Human-readable size for tree summaries, e.g. "38 MB" (1024-based like --shard-size)."""
+    unit = 0
+    while size >= 1024 and unit < len(SIZE_LABELS) - 1:
+        size /= 1024
+        unit += 1
+    if unit == 0:
+        return f"{size:,} bytes"
+    return f"{size:.1f} {SIZE_LABELS[unit]}" if size < 10 else f"{size:,.0f} {SIZE_LABELS[unit]}"
+
+
+def _summary_line(dirs, files, size, more):
+    """The line standing in for entries left out of the tree, e.g. "… 4,312 more files (38 MB)"."""
+    more = " more" if more else ""
+    parts = []
+    if dirs:
+        parts.append(f"{dirs:,}{more} director{'y' if dirs == 1 else 'ies'}")
+    if files or not dirs:
+        parts.append(f"{files:,}{more} file{'' if files == 1 else 's'} ({format_size(size)})")
+    return "… " + ", ".join(parts)
+
+
+def _render_tree(root_dir, root_handle, list_dir, excludes_contents, file_size, write, max_depth=None,
+                 max_entries=None):
+    """
+    Render the tree depth-first, shared by all scanners. Lines are passed to write() as they are produced.
+
+    list_dir(handle, relpath) returns the visible (name, is_dir, handle) children of a
+    directory in display order, where relpath is the directory's relative path with a
+    trailing '/'. Directories with a None handle (symlinks) are shown but not entered,
+    nor are those whose whole content is excluded (e.g. 'build/**'). file_size(handle)
+    returns the size of a file entry.
+
+    Entries deeper than max_depth levels, and the entries of a directory after its first
+    max_entries, are still walked (so their files are collected) but left out of the tree:
+    they are counted into a summary line closing the closest directory that is shown.
+    """
+    write(os.path.basename(os.path.abspath(root_dir)))
+
+    def new_frame(entries, prefix, relpath, depth, summary):
+        # summary is the [directories, files, bytes] counter entries of this frame are hidden into: the
+        # counter of the closest shown directory, or None if the frame is shown. more is None unless the
+        # frame owns a counter, and tells whether its summary line follows shown entries ("… 12 more files").
+        more = None
+        if summary is None:
+            if max_depth is not None and depth > max_depth:
+                summary, more = [0, 0, 0], False
+            elif max_entries is not None and len(entries) > max_entries:
+                summary, more = [0, 0, 0], True
+        return [entries, 0, prefix, relpath, depth, summary, more]
+
+    # Each frame is [visible entries, next index, line prefix, relative path, depth, summary, more].
+    stack = [new_frame(list_dir(root_handle, ""), "", "", 1, None)]
+    while stack:
+        frame = stack[-1]
+        entries, index, prefix, relpath, depth, summary, more = frame
+        if index == len(entries):
+            stack.pop()
+            if more is not None and (summary[0] or summary[1]):
+                write(prefix + LAST_BRANCH + _summary_line(*summary, more))
+            continue
+        frame[1] = index + 1
+        name, is_dir, handle = entries[index]
+        shown = summary is None or (more and index < max_entries)
+        is_last = summary is None and index == len(entries) - 1
+        if shown:
+            write(prefix + (LAST_BRANCH if is_last else BRANCH) + name)
+        elif is_dir:
+            summary[0] += 1
+        else:
+            summary[1] += 1
+            summary[2] += file_size(handle)
+        if is_dir and handle is not None:
+            child_relpath = relpath + name + "/"
+            children = [] if excludes_contents(relpath + name) else list_dir(handle, child_relpath)
+            stack.append(new_frame(children, prefix + (SPACE if is_last else PIPE), child_relpath, depth + 1,
+                                   None if shown else summary))
+
+
+def _timed_rules(rules, stats):
+    """Return the RuleSet methods used while scanning, timed as the "match" phase if stats are detailed."""
+    funcs = (rules.excludes_dir, rules.excludes_file, rules.include.match, rules.excludes_contents)
+    if stats is None or not stats.detailed:
+        return funcs
+    return tuple(stats.timed("match", f) for f in funcs)
+
+
+def _file_size(stat):
+    """Return a file_size() for _render_tree from a stat function; unreadable files count as empty."""
+    def file_size(handle):
+        try:
+            return stat(handle)
+        except (OSError, KeyError):
+            return 0
+    return file_size
+
+
+def scan_tree(root_dir, rules, stats=None, max_depth=None, max_entries=None):
+    """
+    Walk root_dir once with os.scandir and apply the include/exclude rules (a RuleSet) a single time.
+
+    Excluded directories are pruned before they are listed (see RuleSet for the
+    gitignore-style path rules), every other
+    entry shows up in the tree, and files that also match an include pattern
+    are returned in os.walk order (a directory's files before its subdirectories),
+    with entries sorted by name so the output is deterministic.
+    max_depth and max_entries limit the tree section, not the collection (see _render_tree).
+    """
+    excludes_dir, excludes_file, includes, excludes_contents = _timed_rules(rules, stats)
+    counts = {"dirs_scanned": 0, "files_scanned": 0}
+
+    files = []
+
+    def list_dir(path, relpath):
+        """Return the visible entries of a directory and queue its included files."""
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            # os.walk silently skips directories it cannot list; so do we.
+            return []
+
+        counts["dirs_scanned"] += 1
+        counts["files_scanned"] += len(entries)
+        visible = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                counts["files_scanned"] -= 1
+            entry_relpath = relpath + entry.name
+            if excludes_dir(entry.name, entry_relpath) if is_dir else excludes_file(entry.name, entry_relpath):
+                continue
+            # Like os.walk, symlinked directories are listed but not followed.
+            if is_dir:
+                visible.append((entry.name, True, None if entry.is_symlink() else entry.path))
+            else:
+                visible.append((entry.name, False, entry))
+            if not is_dir and includes(entry.name):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append(FileEntry(entry.path, entry_relpath, st.st_size, st.st_mtime_ns))
+        return visible
+
+    tree = TreeSection()
+    _render_tree(root_dir, root_dir, list_dir, excludes_contents, _file_size(lambda entry: entry.stat().st_size),
+                 tree.add, max_depth, max_entries)
+    tree.finish()
+    if stats is not None:
+        stats.add(**counts)
+    return ScanResult(tree, files)
+
+
+def scan_paths(root_dir, relpaths, rules, stats=None, stat=None, max_depth=None, max_entries=None):
+    """
+    Build the same ScanResult as scan_tree() from a list of '/'-separated file paths relative to root_dir
+    (e.g. read from the git index or an archive) instead of listing directories. Paths ending with '/' are
+    (possibly empty) directories. Only included files are stat'ed, with stat(relpath) -> (size, mtime_ns)
+    if given and os.stat() otherwise; included files that cannot be stat'ed are dropped from the tree and
+    the collection.
+    """
+    excludes_dir, excludes_file, includes, excludes_contents = _timed_rules(rules, stats)
+    counts = {"dirs_scanned": 0, "files_scanned": 0}
+
+    # Nested dicts: directory name -> dict, file name -> None. Excluded directories map to
+    # EXCLUDED so the rules run once per directory, not once per file below it.
+    EXCLUDED = object()
+    root = {}
+    for relpath in relpaths:
+        is_dir = relpath.endswith("/")
+        parts = relpath.rstrip("/").split("/")
+        node = root
+        for depth, part in enumerate(parts if is_dir else parts[:-1]):
+            child = node.get(part)
+            if child is None:
+                dir_relpath = "/".join(parts[:depth + 1])
+                child = node[part] = EXCLUDED if excludes_dir(part, dir_relpath) else {}
+                if child is not EXCLUDED:
+                    counts["dirs_scanned"] += 1
+            if child is EXCLUDED:
+                break
+            node = child
+        else:
+            if is_dir:
+                continue
+            counts["files_scanned"] += 1
+            if not excludes_file(parts[-1], relpath) and not isinstance(node.get(parts[-1]), dict):
+                node[parts[-1]] = None
+
+    files = []
+
+    def list_dir(node, relpath):
+        """Return the visible entries of a directory node and queue its included files."""
+        visible = []
+        for name in sorted(node):
+            child = node[name]
+            if child is EXCLUDED:
+                continue
+            is_dir = child is not None
+            if not is_dir and includes(name):
+                path = os.path.join(root_dir, *(relpath + name).split("/"))
+                try:
+                    if stat is not None:
+                        size, mtime_ns = stat(relpath + name)
+                    else:
+                        st = os.stat(path)
+                        size, mtime_ns = st.st_size, st.st_mtime_ns
+                except (OSError, KeyError):
+                    # E.g. tracked in the git index but deleted from the working tree: neither listed nor collected.
+                    continue
+                files.append(FileEntry(path, relpath + name, size, mtime_ns))
+            visible.append((name, is_dir, child if is_dir else relpath + name))
+        return visible
+
+    def size_of(file_relpath):
+        if stat is not None:
+            return stat(file_relpath)[0]
+        return os.stat(os.path.join(root_dir, *file_relpath.split("/"))).st_size
+
+    tree = TreeSection()
+    _render_tree(root_dir, root, list_dir, excludes_contents, _file_size(size_of), tree.add, max_depth, max_entries)
+    tree.finish()
+    if stats is not None:
+        stats.add(**counts)
+    return ScanResult(tree, files)
@@ -0,0 +1,252 @@
+"""
+Keep the output up to date while files change (2gpt watch).
+
+Changes are detected with inotify on Linux (through ctypes, no extra dependency) and by polling
+mtimes everywhere else. A burst of events is debounced into one rebuild, and every rebuild is an
+incremental run: unchanged blocks are copied from the previous output, the tree is re-rendered,
+and the new output replaces the old one atomically.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+
+from .manifest import manifest_path
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def _watched_dirs(path, relpath, rules):
+    """
+    Yield (path, relpath) for the directory path and every directory below it that the walk would enter.
+    relpath is the directory's path relative to the root with a trailing '/' ("" for the root).
+    """
+    stack = [(path, relpath)]
+    while stack:
+        path, relpath = stack.pop()
+        yield path, relpath
+        if relpath and rules.excludes_contents(relpath.rstrip("/")):
+            continue
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            entry_relpath = relpath + entry.name
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+            if not rules.excludes_dir(entry.name, entry_relpath):
+                stack.append((entry.path, entry_relpath + "/"))
+
+
+def _output_paths(collector):
+    """
+    Absolute paths of the output, its manifest and their temporary files, which every rebuild writes itself,
+    wherever output_file puts them.
+    """
+    output = collector.output_path()
+    paths = (output, manifest_path(output))
+    return {os.path.abspath(path + suffix) for path in paths for suffix in ("", ".tmp")}
+
+
+class InotifyWatcher:
+    """Watch every visible directory with inotify and report changes to paths that affect the output."""
+
+    def __init__(self, collector):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.collector = collector
+        self.dirs = {}  # watch descriptor -> relpath with a trailing '/' ("" for the root)
+        self.add_tree(collector.root_dir, "")
+
+    def add_tree(self, path, relpath):
+        for dir_path, dir_relpath in _watched_dirs(path, relpath, self.collector.rules()):
+            self._watch(dir_path, dir_relpath)
+
+    def _watch(self, path, relpath):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # Gone already or unreadable, the walk skips it too.
+            raise OSError(err, f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        self.dirs[wd] = relpath
+
+    def close(self):
+        os.close(self.fd)
+
+    def _relevant(self, relpath, name, is_dir):
+        collector = self.collector
+        path = os.path.abspath(os.path.join(collector.root_dir, *(relpath + name).split("/")))
+        if path == os.path.abspath(os.path.join(collector.base_dir, ".gptignore")):
+            return True
+        if path in _output_paths(collector):
+            return False
+        rules = collector.rules()
+        entry_relpath = relpath + name
+        return not (rules.excludes_dir(name, entry_relpath) if is_dir else rules.excludes_file(name, entry_relpath))
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds (None: forever) and return True if something relevant changed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            relpath = self.dirs.get(wd)
+            if relpath is None:
+                continue
+            if not name:
+                # The watched directory itself was deleted or moved.
+                changed = True
+                continue
+            name = os.fsdecode(name)
+            is_dir = bool(mask & IN_ISDIR)
+            if not self._relevant(relpath, name, is_dir):
+                continue
+            changed = True
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                path = os.path.join(self.collector.root_dir, *(relpath + name).split("/"))
+                self.add_tree(path, relpath + name + "/")
+        return changed
+
+    def refresh(self):
+        """
+        Called after every rebuild: the rules may have changed with the config, so the watches are synced with
+        the directories the walk enters now, adding the newly visible ones and dropping the hidden ones.
+        """
+        wanted = {relpath: path for path, relpath in _watched_dirs(self.collector.root_dir, "", self.collector.rules())}
+        for wd, relpath in list(self.dirs.items()):
+            if relpath not in wanted:
+                self._rm_watch(self.fd, wd)
+                del self.dirs[wd]
+        watched = set(self.dirs.values())
+        for relpath, path in wanted.items():
+            if relpath not in watched:
+                self._watch(path, relpath)
+
+
+class PollingWatcher:
+    """Detect changes by comparing the mtimes of the visible directories and the collected files."""
+
+    def __init__(self, collector, interval=1.0):
+        self.collector = collector
+        self.interval = interval
+        self.snapshot = None
+        self.refresh()
+
+    def _signature(self):
+        paths = [path for path, _ in _watched_dirs(self.collector.root_dir, "", self.collector.rules())]
+        paths.extend(entry.path for entry in self.collector.scan().files)
+        paths.append(os.path.join(self.collector.base_dir, ".gptignore"))
+        signature = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signature[path] = (st.st_mtime_ns, st.st_size)
+        return signature
+
+    def refresh(self):
+        self.snapshot = self._signature()
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        signature = self._signature()
+        if signature == self.snapshot:
+            return False
+        self.snapshot = signature
+        return True
+
+    def close(self):
+        pass
+
+
+def create_watcher(collector, polling=False, interval=1.0):
+    """Return an InotifyWatcher where inotify is available, a PollingWatcher otherwise."""
+    if not polling and hasattr(os, "O_CLOEXEC"):
+        try:
+            return InotifyWatcher(collector)
+        except (OSError, AttributeError, TypeError) as e:
+            logger.warning(f"inotify is not available ({e}), polling for changes every {interval}s.")
+    return PollingWatcher(collector, interval)
+
+
+def _rebuild(collector):
+    collector.reload_config()
+    start = time.perf_counter()
+    collector.run()
+    logger.info(f"Updated {collector.output_file} in {time.perf_counter() - start:.3f}s.")
+
+
+def watch(collector, debounce=0.2, polling=False, interval=1.0):
+    """
+    Build the output incrementally, then rebuild it after every burst of changes until interrupted.
+    A rebuild starts once no relevant change was seen for debounce seconds.
+    """
+    collector.incremental = True
+    collector.full = False
+    collector.run()
+    watcher = create_watcher(collector, polling, interval)
+    logger.warning(f"Watching {os.path.abspath(collector.root_dir)} for changes ({type(watcher).__name__}), "
+                   f"press Ctrl+C to stop.")
+    try:
+        while True:
+            if not watcher.wait(None):
+                continue
+            while watcher.wait(debounce):
+                pass
+            _rebuild(collector)
+            watcher.refresh()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()